@@ -1,5 +1,5 @@
 # backend/app.py  (replace your existing file with this)
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from dotenv import load_dotenv
 from learning.topics import get_learning_topics
@@ -10,11 +10,27 @@ from utils.rag_utils import retrieve, get_investment_advice_context  # KB retrie
 from utils.report import create_report
 from utils.stock_predictor import stock_predictor
 from utils.live_data_service import live_data_service
+from utils.prefetch_scheduler import prefetch_scheduler
+from utils.quote_stream import quote_stream
+from utils.history_store import history_store
+from utils.market_frame import market_frames
+from utils.feature_engine import feature_engine
 from utils.enhanced_ml_advisor import enhanced_ml_advisor
+from utils.training_jobs import training_jobs
+from utils.backtest import backtester
+from utils.goal_engine import grid_axes, inflate, project_goals, required_sip, sip_grid
+from utils.goal_simulator import MAX_MONTHS, simulate_goal, volatility_for
+from utils.goal_optimizer import optimize_goals
+from utils.peer_index import peer_index
+from utils.scoring import score_frame, score_one
+from utils.retirement_engine import simulate_retirement
 from tinydb import TinyDB
 from datetime import datetime
 import requests
 import psycopg2, json
+import base64
+import re
+import pandas as pd
 from psycopg2.extras import RealDictCursor
 # -------------------------
 # LOAD ENV
@@ -48,37 +64,14 @@ records_table = db.table("records")
 goals_table = db.table("goals")
 print(f"📦 TinyDB path: {DB_FILE}")
 
-
-
 # ===============================
 # POSTGRESQL (CLOUD PRIMARY)
 # ===============================
-pg_conn = psycopg2.connect(
-    host=os.getenv("PG_HOST"),
-    port=os.getenv("PG_PORT"),
-    database=os.getenv("PG_DATABASE"),
-    user=os.getenv("PG_USER"),
-    password=os.getenv("PG_PASSWORD"),
-)
-pg_cursor = pg_conn.cursor()
-print("✅ PostgreSQL connected")
-
-pg_cursor.execute("""
-CREATE TABLE IF NOT EXISTS goals (
-    id SERIAL PRIMARY KEY,
-    name TEXT,
-    target NUMERIC,
-    months INTEGER,
-    current_saved NUMERIC,
-    risk TEXT,
-    sip INTEGER,
-    projection JSONB,
-    milestones JSONB,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-""")
-pg_conn.commit()
-print("✅ PostgreSQL tables ready")
+# Connected by start_services() rather than at import: the training,
+# simulation and backtest pools spawn their workers, and a spawned worker
+# re-imports the server's main module (this file) as __mp_main__
+pg_conn = None
+pg_cursor = None
 
 # =========================================================
 # GOALS API (ONLY ONE SOURCE OF TRUTH)
@@ -342,7 +335,7 @@ def predict():
 
     # Save record
     record_id = len(records_table) + 1
-    records_table.insert({
+    record = {
         "id": record_id,
         "income": income,
         "expenses": expenses,
@@ -352,7 +345,9 @@ def predict():
         "fd": allocation.get("FD", 0),
         "stocks": allocation.get("Stocks", 0),
         "created_at": datetime.utcnow().isoformat()
-    })
+    }
+    records_table.insert(record)
+    peer_index.add_records([record])
 
     # -------------------------
     # KB Context
@@ -432,27 +427,172 @@ def goal_plan():
     goal_cost = float(data.get("goal_cost", 0))
     years = int(data.get("years", 1))
     expected_return = 0.12  # 12% average SIP return
+    current_saved = float(data.get("current_saved", 0))
+    step_up = float(data.get("step_up_pct", 0)) / 100         # annual SIP increase
+    inflation = float(data.get("inflation_pct", 0)) / 100     # annual goal-cost inflation
 
-    if goal_cost <= 0 or years <= 0:
+    if goal_cost <= 0 or years <= 0 or current_saved < 0:
         return jsonify({"error": "Invalid values"}), 400
+    if years * 12 > MAX_MONTHS:
+        return jsonify({"error": f"years must be at most {MAX_MONTHS // 12}"}), 400
 
     months = years * 12
     monthly_rate = expected_return / 12
 
-    try:
-        # SIP formula:  FV = SIP * [((1+r)^n -1)/r]
-        sip_needed = goal_cost / (((1 + monthly_rate)**months - 1) / monthly_rate)
-    except:
-        sip_needed = goal_cost / months
+    # SIP formula:  FV = SIP * [((1+r)^n -1)/r], generalised for step-up,
+    # inflation and the lump sum already saved
+    sip_needed = float(required_sip(goal_cost, current_saved, months, monthly_rate, step_up, inflation))
 
-    return jsonify({
+    result = {
         "goal_name": goal_name,
         "goal_cost": goal_cost,
         "years": years,
         "monthly_sip_required": round(sip_needed, 2),
         "message": f"To achieve '{goal_name}', invest ₹{round(sip_needed,2)} per month."
+    }
+
+    if step_up or inflation or current_saved:
+        result.update({
+            "current_saved": current_saved,
+            "step_up_pct": step_up * 100,
+            "inflation_pct": inflation * 100,
+            "inflated_goal_cost": round(float(inflate(goal_cost, inflation, months)), 2),
+            "yearly_sip": [round(sip_needed * (1 + step_up) ** y, 2) for y in range(years)],
+        })
+        if step_up:
+            result["message"] = (
+                f"To achieve '{goal_name}', start with ₹{round(sip_needed,2)} per month "
+                f"and raise it by {step_up * 100:g}% every year."
+            )
+
+    # Optional stochastic mode: return paths around the same 1%/month the SIP
+    # formula compounds at, with the same end-of-month payments
+    if data.get("mode") == "stochastic":
+        try:
+            result["simulation"] = simulate_goal(
+                target=goal_cost,
+                months=months,
+                sip=float(data.get("monthly_sip", sip_needed)),
+                current_saved=current_saved,
+                monthly_rate=monthly_rate,
+                step_up=step_up,
+                inflation=inflation,
+                annual_volatility=float(data.get("volatility", volatility_for(data.get("risk")))),
+                n_paths=int(data.get("paths", 20000)),
+                seed=int(data.get("seed", 42)),
+                confidence=float(data.get("confidence", 0.9)),
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid simulation values: {e}"}), 400
+
+    return jsonify(result)
+
+@app.route("/goal-plan/projection", methods=["POST"])
+def goal_projection():
+    data = request.get_json(force=True) or {}
+    goals = data.get("goals", [data] if "target" in data else [])
+    include_rows = bool(data.get("include_rows", True))
+
+    if not isinstance(goals, list) or not goals:
+        return jsonify({"error": "Provide a goal or a list of goals"}), 400
+
+    try:
+        projections = project_goals(goals, include_rows=include_rows)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid goal values: {e}"}), 400
+
+    return jsonify({"count": len(projections), "projections": projections})
+
+@app.route("/goal-plan/grid", methods=["POST"])
+def goal_plan_grid():
+    data = request.get_json(force=True) or {}
+
+    try:
+        goal_cost = float(data.get("goal_cost", 0))
+        current_saved = float(data.get("current_saved", 0))
+        inflation = float(data.get("inflation_pct", 0)) / 100
+        rate_pct, years, step_up_pct = grid_axes(
+            (data.get("rate_pct"), {"start": 4, "stop": 16, "num": 25}),
+            (data.get("years"), {"start": 1, "stop": 30, "num": 30}),
+            (data.get("step_up_pct"), [0]),
+        )
+        if goal_cost <= 0:
+            raise ValueError("goal_cost must be greater than 0")
+        grid = sip_grid(goal_cost, rate_pct / 100, years, step_up_pct / 100, current_saved, inflation)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid grid values: {e}"}), 400
+
+    # Flat row-major array (rate, years, step-up); base64 float32 for large grids
+    if data.get("encoding") == "base64":
+        values = base64.b64encode(grid.astype("<f4").tobytes()).decode("ascii")
+    else:
+        values = grid.round(2).ravel().tolist()
+
+    return jsonify({
+        "goal_cost": goal_cost,
+        "axes": {
+            "rate_pct": rate_pct.tolist(),
+            "years": years.tolist(),
+            "step_up_pct": step_up_pct.tolist(),
+        },
+        "shape": list(grid.shape),
+        "encoding": data.get("encoding", "json"),
+        "monthly_sip_required": values,
     })
 
+@app.route("/goal-plan/optimize", methods=["POST"])
+def goal_optimize():
+    data = request.get_json(force=True) or {}
+
+    # Budget is either given directly or derived the same way as /expense-analyze
+    try:
+        if data.get("monthly_savings") is not None:
+            monthly_savings = float(data["monthly_savings"])
+        else:
+            monthly_savings = float(data.get("income", 0)) - float(data.get("expenses", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid savings values"}), 400
+
+    if monthly_savings <= 0:
+        return jsonify({"error": "Monthly savings must be greater than 0"}), 400
+
+    # Fall back to the saved goals when the client doesn't send its own list
+    goals = data.get("goals")
+    if goals is None:
+        goals = [serialize_goal(g) for g in goals_table.all() if float(g.get("target") or 0) > 0]
+
+    try:
+        plan = optimize_goals(goals, monthly_savings)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid goal values: {e}"}), 400
+
+    return jsonify(plan)
+
+# ---------------------------------------
+# RETIREMENT PLANNING
+# ---------------------------------------
+@app.route("/retirement-plan", methods=["POST"])
+def retirement_plan():
+    data = request.get_json(force=True) or {}
+    profiles = data.get("profiles", [data])
+
+    if not isinstance(profiles, list) or not profiles:
+        return jsonify({"error": "Provide a profile or a list of profiles"}), 400
+
+    try:
+        plans = simulate_retirement(
+            profiles,
+            n_paths=int(data.get("paths", 5000)),
+            seed=int(data.get("seed", 42)),
+            confidence=float(data.get("confidence", 0.9)),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid retirement values: {e}"}), 400
+
+    if "profiles" not in data:
+        return jsonify(plans[0])
+    return jsonify({"count": len(plans), "plans": plans})
+
 # ---------------------------------------
 # 2️⃣ EXPENSE ANALYZER
 # ---------------------------------------
@@ -465,23 +605,25 @@ def expense_analyzer():
     if income <= 0:
         return jsonify({"error": "Income must be greater than 0"}), 400
 
-    savings = income - expenses
-    savings_rate = (savings / income) * 100
+    scored = score_one(income, expenses)
+    savings = scored["savings"]
+    savings_rate = scored["savings_rate"]
 
-    suggestions = []
-    if savings_rate < 10:
-        suggestions.append("Your savings rate is low — reduce discretionary spending.")
-    elif savings_rate < 20:
-        suggestions.append("Moderate savings — try budgeting 50-30-20 rule.")
-    else:
-        suggestions.append("Excellent savings habit — increase SIP amount for faster growth!")
+    suggestions = [scored["suggestion"]]
+
+    # Compare against peers (in the age cohort when an age is given)
+    age = int(data.get("age", 0) or 0)
+    peers = peer_index.benchmark(income, expenses, age or None)
+    if peers.get("message"):
+        suggestions.append(peers["message"])
 
     return jsonify({
         "income": income,
         "expenses": expenses,
         "savings": savings,
         "savings_rate": round(savings_rate, 2),
-        "suggestions": suggestions
+        "suggestions": suggestions,
+        "peer_benchmark": peers
     })
 
 # ---------------------------------------
@@ -495,28 +637,42 @@ def financial_health_score():
     age = int(data.get("age", 0))
     risk = int(data.get("risk", 3))
 
-    savings = income - expenses
-    savings_rate = (savings / income * 100) if income > 0 else 0
-
-    # Score components
-    score = 0
-    score += min(40, savings_rate * 2)         # max 40 points
-    score += 30 if risk >= 3 else 20           # risk profile
-    score += 30 if age < 40 else 20            # age advantage
-
-    category = (
-        "Needs Improvement 😟" if score < 40 else
-        "Growing Investor 🚀" if score < 70 else
-        "Smart Wealth Builder 💰"
-    )
+    # Score components: savings (max 40) + risk profile + age advantage
+    scored = score_one(income, expenses, age, risk)
+    score = scored["score"]
+    category = scored["category"]
+    savings_rate = scored["savings_rate"]
+
+    peers = peer_index.benchmark(income, expenses, age or None)
 
     return jsonify({
         "score": round(score),
         "category": category,
         "savings_rate": round(savings_rate, 2),
-        "message": f"Your Financial Health Score is {round(score)} — {category}"
+        "message": f"Your Financial Health Score is {round(score)} — {category}",
+        "peer_benchmark": peers
     })
 
+@app.route("/health-score/batch", methods=["POST"])
+def financial_health_score_batch():
+    data = request.get_json(silent=True) or {}
+
+    # Score the posted profiles, or every stored record when none are given
+    rows = data.get("records")
+    if rows is None:
+        rows = records_table.all()
+    if not isinstance(rows, list):
+        return jsonify({"error": "records must be a list"}), 400
+    if not rows:
+        return jsonify({"count": 0, "results": []})
+
+    try:
+        scored = score_frame(pd.DataFrame(rows))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid records: {e}"}), 400
+
+    return jsonify({"count": len(scored), "results": scored.to_dict(orient="records")})
+
 # ---------------------------------------
 # 4️⃣ BEGINNER LEARNING HUB
 ## 4️⃣ BEGINNER LEARNING HUB
@@ -526,6 +682,181 @@ def learning_hub():
     topics = get_learning_topics()
     return jsonify({"topics": topics})
 
+# -------------------------
+# Market data service status
+# -------------------------
+@app.route("/market/status", methods=["GET"])
+def market_status():
+    return jsonify({
+        "cache": live_data_service.cache_stats(),
+        "rate_limiter": live_data_service.limiter_stats(),
+        "coalescing": live_data_service.coalescing_stats(),
+        "prefetch": prefetch_scheduler.stats(),
+        "history_store": history_store.stats(),
+        "market_frames": market_frames.stats(),
+        "provider": live_data_service.provider.stats(),
+        "slowest_symbols_ms": live_data_service.latency_stats(),
+        "stream": quote_stream.stats(),
+        "stock_models": stock_predictor.registry.stats(),
+        "feature_engine": feature_engine.stats(),
+        "backtests": backtester.stats(),
+    })
+
+SYMBOL_RE = re.compile(r"[A-Z0-9.^=\-]{1,15}")
+
+@app.route("/stream/quotes", methods=["GET"])
+def stream_quotes():
+    """Server-sent events: a snapshot, then only the fields that changed per symbol"""
+    raw = request.args.get("symbols", "")
+    symbols = [s.strip().upper() for s in raw.split(",") if s.strip()]
+    symbols = list(dict.fromkeys(s for s in symbols if SYMBOL_RE.fullmatch(s)))
+    if not symbols:
+        return jsonify({"error": "symbols query parameter required, e.g. ?symbols=AAPL,MSFT"}), 400
+    if len(symbols) > 50:
+        return jsonify({"error": "At most 50 symbols per stream"}), 400
+
+    return Response(
+        quote_stream.events(symbols),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _deadline_arg():
+    try:
+        deadline = request.args.get("deadline", type=float)
+    except ValueError:
+        deadline = None
+    return None if deadline is None else min(max(deadline, 0.1), 30.0)
+
+@app.route("/live/market-overview", methods=["GET"])
+def live_market_overview():
+    return jsonify(live_data_service.market_overview_report(_deadline_arg()))
+
+@app.route("/live/trending", methods=["GET"])
+def live_trending():
+    limit = request.args.get("limit", 10, type=int)
+    return jsonify(live_data_service.trending_report(max(1, min(limit, 50)), _deadline_arg()))
+
+@app.route("/live/indicators", methods=["GET"])
+def live_indicators():
+    """Latest technical indicators for a list of symbols (default: the popular stocks)"""
+    raw = request.args.get("symbols", "")
+    symbols = [s.strip().upper() for s in raw.split(",") if s.strip()] or live_data_service.popular_stocks
+    symbols = list(dict.fromkeys(s for s in symbols if SYMBOL_RE.fullmatch(s)))
+    if len(symbols) > 200:
+        return jsonify({"error": "At most 200 symbols per request"}), 400
+    return jsonify({"indicators": live_data_service.calculate_universe_indicators(symbols)})
+
+# -------------------------
+# Stock Predictor
+# -------------------------
+@app.route("/stocks/popular", methods=["GET"])
+def popular_stocks():
+    stocks = [
+        {"symbol": sym, "name": live_data_service.cached_name(sym), "has_model": stock_predictor.has_model(sym)}
+        for sym in live_data_service.popular_stocks
+    ]
+    return jsonify({"success": True, "stocks": stocks})
+
+@app.route("/stock/analyze/<symbol>", methods=["GET"])
+def stock_analyze(symbol):
+    symbol = symbol.upper()
+    if not SYMBOL_RE.fullmatch(symbol):
+        return jsonify({"success": False, "message": "Invalid symbol"}), 400
+    analysis = stock_predictor.get_stock_analysis(symbol)
+    if not analysis:
+        return jsonify({"success": False, "message": f"No market data for {symbol}"})
+    return jsonify({"success": True, "analysis": analysis})
+
+@app.route("/stock/predict/<symbol>", methods=["GET"])
+def stock_predict(symbol):
+    symbol = symbol.upper()
+    if not SYMBOL_RE.fullmatch(symbol):
+        return jsonify({"success": False, "message": "Invalid symbol"}), 400
+    # Predictions only use models already trained; training is an explicit POST
+    if not stock_predictor.has_model(symbol):
+        return jsonify({"success": False, "message": f"No trained model for {symbol}. Train it first."})
+    days = request.args.get("days", 5, type=int)
+    prediction = stock_predictor.predict_price(symbol, days)
+    if not prediction:
+        return jsonify({"success": False, "message": f"No market data for {symbol}"})
+    return jsonify({"success": True, "prediction": prediction})
+
+@app.route("/stock/predict-multi/<symbol>", methods=["GET"])
+def stock_predict_multi(symbol):
+    """All horizons of the symbol's multi-horizon model, with per-tree prediction intervals"""
+    symbol = symbol.upper()
+    if not SYMBOL_RE.fullmatch(symbol):
+        return jsonify({"success": False, "message": "Invalid symbol"}), 400
+    interval = request.args.get("interval", 0.8, type=float)
+    if not 0 < interval < 1:
+        return jsonify({"success": False, "message": "interval must be between 0 and 1"}), 400
+    prediction = stock_predictor.predict_price_multi(symbol, interval)
+    if not prediction:
+        return jsonify({"success": False, "message": f"No multi-horizon model for {symbol}. Train one with horizons first."})
+    return jsonify({"success": True, "prediction": prediction})
+
+@app.route("/stock/backtest/<symbol>", methods=["GET"])
+def stock_backtest(symbol):
+    """Walk-forward backtest of the predictor's model recipe (cached per symbol and settings)"""
+    symbol = symbol.upper()
+    if not SYMBOL_RE.fullmatch(symbol):
+        return jsonify({"success": False, "message": "Invalid symbol"}), 400
+    config = {k: request.args.get(k) for k in ("period", "window", "train_size", "retrain_every",
+                                               "target_days", "n_estimators", "cost_bps", "long_only")}
+    try:
+        result = backtester.run(symbol, config)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    if not result:
+        return jsonify({"success": False, "message": f"Not enough market data to backtest {symbol}"})
+    return jsonify({"success": True, "backtest": result})
+
+@app.route("/stock/train/<symbol>", methods=["POST"])
+def stock_train(symbol):
+    """Queue a training job; poll /jobs/<id> for progress"""
+    symbol = symbol.upper()
+    if not SYMBOL_RE.fullmatch(symbol):
+        return jsonify({"success": False, "message": "Invalid symbol"}), 400
+    params = {**(request.get_json(silent=True) or {}), "symbol": symbol}
+    try:
+        job = training_jobs.submit("stock", params)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({"success": True, "message": f"Training started for {symbol}", "job": job}), 202
+
+# -------------------------
+# Training jobs
+# -------------------------
+@app.route("/jobs/train", methods=["POST"])
+def submit_training_job():
+    data = request.get_json(silent=True) or {}
+    params = dict(data.get("params") or {})
+    try:
+        job = training_jobs.submit(data.get("kind", ""), params)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(job), 202
+
+@app.route("/jobs", methods=["GET"])
+def list_training_jobs():
+    limit = request.args.get("limit", 50, type=int)
+    return jsonify({"jobs": training_jobs.list(max(1, min(limit, 200))), "stats": training_jobs.stats()})
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_training_job(job_id):
+    job = training_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_training_job(job_id):
+    job = training_jobs.cancel(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
 # -------------------------
 # History & Report
 # -------------------------
@@ -679,16 +1010,18 @@ def chatbot():
 
 # data base render
 
-pg_conn = psycopg2.connect(
-    host=os.getenv("PG_HOST"),
-    port=os.getenv("PG_PORT"),
-    database=os.getenv("PG_DATABASE"),
-    user=os.getenv("PG_USER"),
-    password=os.getenv("PG_PASSWORD"),
-)
-pg_cursor = pg_conn.cursor()
+def connect_pg():
+    global pg_conn, pg_cursor
+    pg_conn = psycopg2.connect(
+        host=os.getenv("PG_HOST"),
+        port=os.getenv("PG_PORT"),
+        database=os.getenv("PG_DATABASE"),
+        user=os.getenv("PG_USER"),
+        password=os.getenv("PG_PASSWORD"),
+    )
+    pg_cursor = pg_conn.cursor()
+    print("✅ PostgreSQL connected successfully")
 
-print("✅ PostgreSQL connected successfully")
 def create_pg_tables():
     pg_cursor.execute("""
         CREATE TABLE IF NOT EXISTS goals (
@@ -706,8 +1039,18 @@ def create_pg_tables():
     """)
     pg_conn.commit()
     print("✅ PostgreSQL tables ready")
-create_pg_tables()
-pg_cursor = pg_conn.cursor()
+
+def start_services():
+    """Database connection and background services; run once in the server process"""
+    connect_pg()
+    create_pg_tables()
+
+    # Peer benchmarks: snapshot + CSV baseline, caught up with stored records
+    peer_index.warm_up(records_table.all())
+
+    # Keep popular/hot market quotes warm ahead of cache expiry
+    if os.getenv("MARKET_PREFETCH", "1") == "1":
+        prefetch_scheduler.start()
 
 
 
@@ -716,4 +1059,5 @@ pg_cursor = pg_conn.cursor()
 # -------------------------
 if __name__ == "__main__":
     print(f"TinyDB path: {DB_FILE}")
+    start_services()
     app.run(port=5500, debug=True)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compare the vectorized indicator library (utils/indicators.py) with the
+per-symbol pandas implementation (MarketFrame.features) on synthetic bars.
+
+    python indicator_benchmark.py                        # 1, 100 and 5000 symbols
+    python indicator_benchmark.py --sizes 1 100 --bars 250
+
+For each universe size it prints both timings, the speed-up and the
+largest relative difference between the two over every feature column.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from utils import indicators
+from utils.market_frame import FEATURE_COLUMNS, MarketFrame
+
+
+def synthetic_universe(n_symbols: int, n_bars: int, seed: int = 42):
+    """Geometric-random-walk closes and lognormal volumes, shaped (symbols, bars)"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0004, 0.02, size=(n_symbols, n_bars))
+    start = rng.uniform(20, 500, size=(n_symbols, 1))
+    close = start * np.exp(np.cumsum(returns, axis=1))
+    volume = np.round(rng.lognormal(15, 0.5, size=(n_symbols, n_bars)))
+    return close, volume
+
+
+def run_pandas(close: np.ndarray, volume: np.ndarray, index: pd.DatetimeIndex) -> np.ndarray:
+    """Feature columns per symbol via MarketFrame, stacked to (features, symbols, bars)"""
+    out = np.full((len(FEATURE_COLUMNS),) + close.shape, np.nan)
+    for row in range(close.shape[0]):
+        bars = pd.DataFrame({'Close': close[row], 'Volume': volume[row]}, index=index)
+        frame = MarketFrame('', bars)
+        features = {
+            'SMA_5': frame.sma(5), 'SMA_20': frame.sma(20), 'SMA_50': frame.sma(50),
+            'Volatility': frame.volatility(20), 'RSI': frame.rsi(14),
+            'MACD': frame.macd(), 'MACD_Signal': frame.macd_signal(),
+            'Price_Change_1d': frame.pct_change(1), 'Price_Change_5d': frame.pct_change(5),
+            'Price_Change_20d': frame.pct_change(20),
+            'Volume_Ratio': bars['Volume'] / frame.volume_sma(20),
+        }
+        for i, col in enumerate(FEATURE_COLUMNS):
+            out[i, row] = features[col].to_numpy()
+    return out
+
+
+def run_numpy(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    features = indicators.feature_arrays(close, volume)
+    return np.stack([features[col] for col in FEATURE_COLUMNS])
+
+
+def max_rel_diff(a: np.ndarray, b: np.ndarray) -> float:
+    """Largest difference relative to each feature's typical magnitude (MACD crosses zero)"""
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return float('inf')
+    worst = 0.0
+    for expected, actual in zip(a, b):
+        mask = ~np.isnan(expected)
+        if mask.any():
+            scale = max(float(np.median(np.abs(expected[mask]))), 1e-12)
+            worst = max(worst, float(np.max(np.abs(expected[mask] - actual[mask]))) / scale)
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized vs pandas indicator benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 5000])
+    parser.add_argument("--bars", type=int, default=500, help="bars per symbol (~2 years)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=args.bars)
+    print(f"{'symbols':>8} {'pandas ms':>11} {'numpy ms':>10} {'speed-up':>9} {'max rel diff':>13}")
+    ok = True
+    for n in args.sizes:
+        close, volume = synthetic_universe(n, args.bars, args.seed)
+
+        start = time.perf_counter()
+        expected = run_pandas(close, volume, index)
+        pandas_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        actual = run_numpy(close, volume)
+        numpy_ms = (time.perf_counter() - start) * 1000
+
+        diff = max_rel_diff(expected, actual)
+        ok = ok and diff < 1e-8
+        print(f"{n:>8} {pandas_ms:>11.1f} {numpy_ms:>10.1f} {pandas_ms / numpy_ms:>8.1f}x {diff:>13.2e}")
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
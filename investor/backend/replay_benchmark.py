@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Run the live-data and stock-prediction paths offline against replayed
+market-data fixtures, with optional injected latency and failures.
+
+    python replay_benchmark.py                                  # clean replay
+    python replay_benchmark.py --latency-ms 150 --failure-rate 0.1
+    python replay_benchmark.py --generate                       # rebuild synthetic fixtures
+
+Fixtures are generated on first use. A clean run (no failure injection)
+prints the same digest every time.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(__file__))
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+FIXTURES_DIR = os.path.join(DATA_DIR, "market_fixtures")
+
+
+def configure(args, history_dir: str):
+    """Point every market-data module at the replay provider (before they are imported)"""
+    os.environ['MARKET_PROVIDER'] = 'replay'
+    os.environ['MARKET_FIXTURES_DIR'] = args.fixtures
+    os.environ['MARKET_REPLAY_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['MARKET_REPLAY_JITTER_MS'] = str(args.jitter_ms)
+    os.environ['MARKET_REPLAY_FAILURE_RATE'] = str(args.failure_rate)
+    os.environ['MARKET_REPLAY_429_RATE'] = str(args.rate_limit_rate)
+    os.environ['MARKET_REPLAY_SEED'] = str(args.seed)
+    os.environ['MARKET_RATE_PER_SEC'] = str(args.rate)
+    os.environ['MARKET_RATE_BURST'] = str(max(1, int(args.rate)))
+    os.environ['MARKET_HISTORY_DIR'] = history_dir
+    os.environ.pop('MARKET_CACHE_DIR', None)
+
+
+def timed(label: str, fn, results: dict):
+    start = time.perf_counter()
+    try:
+        value = fn()
+    except Exception as e:
+        print(f"[ERROR] {label} failed: {e}")
+        value = None
+    results[label] = value
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return value
+
+
+def digest(results: dict) -> str:
+    """Hash of the market values only (timestamps excluded)"""
+    keep = ('symbol', 'current_price', 'previous_close', 'change_percent', 'volume',
+            'sma_20', 'sma_50', 'rsi', 'recommendation', 'score', 'predicted_price')
+
+    def strip(value):
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in sorted(value.items()) if k in keep or isinstance(v, (dict, list))}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return round(value, 6) if isinstance(value, float) else value
+
+    blob = json.dumps(strip(results), sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()[:12]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the stock data paths")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--generate", action="store_true", help="rebuild synthetic fixtures")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate", type=float, default=1000.0, help="token bucket rate (calls/s)")
+    parser.add_argument("--symbol", default="AAPL", help="symbol used for the predictor paths")
+    args = parser.parse_args()
+
+    history_dir = tempfile.mkdtemp(prefix="replay_history_")
+    configure(args, history_dir)
+
+    from utils.market_provider import generate_fixtures, market_provider
+    from utils.live_data_service import live_data_service
+    from utils.backtest import backtester
+    from utils.feature_engine import compare_with_batch
+    from utils.history_store import history_store
+    from utils.model_registry import ModelRegistry
+    from utils.stock_predictor import stock_predictor
+
+    universe = live_data_service.popular_stocks + live_data_service.major_indices
+    if args.generate or not os.path.isdir(args.fixtures) or not os.listdir(args.fixtures):
+        generate_fixtures(args.fixtures, universe, seed=args.seed)
+        print(f"Generated {len(universe)} synthetic fixtures in {args.fixtures}")
+
+    stock_predictor.registry = ModelRegistry(root=os.path.join(history_dir, "models"))
+    sym = args.symbol
+    results = {}
+    try:
+        timed("quote (cold)", lambda: live_data_service.get_live_stock_data(sym), results)
+        timed("quote (cached)", lambda: live_data_service.get_live_stock_data(sym), results)
+        timed("bulk quotes", lambda: live_data_service.get_multiple_stocks_data(
+            live_data_service.popular_stocks, refresh=True), results)
+        timed("market overview", live_data_service.get_market_overview, results)
+        timed("trending", live_data_service.get_trending_stocks, results)
+        timed("indicators (cold)", lambda: live_data_service.calculate_technical_indicators(sym), results)
+        timed("indicators (stored)", lambda: live_data_service.calculate_technical_indicators(sym), results)
+        timed("recommendation", lambda: live_data_service.get_investment_recommendation(sym), results)
+        timed("train model", lambda: stock_predictor.train_model(sym), results)
+        timed("predict price", lambda: stock_predictor.predict_price(sym), results)
+        timed("stock analysis", lambda: stock_predictor.get_stock_analysis(sym), results)
+        timed("predict (memoized)", lambda: stock_predictor.predict_price(sym), results)
+        timed("analysis (memoized)", lambda: stock_predictor.get_stock_analysis(sym), results)
+        timed("backtest", lambda: backtester.run(sym), results)
+        timed("backtest (cached)", lambda: backtester.run(sym), results)
+        drift = compare_with_batch(history_store.get_history(sym, "1y"))
+        print(f"incremental features vs batch: max abs diff {drift}")
+    finally:
+        shutil.rmtree(history_dir, ignore_errors=True)
+
+    print(f"\nprovider: {market_provider.stats()}")
+    print(f"limiter:  {live_data_service.limiter_stats()}")
+    print(f"digest:   {digest(results)}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Batch health-score / savings scoring for stored records.
+
+Streams the TinyDB records table (or any CSV with Income/Expenses/Age
+columns) in chunks and writes the scores to a Parquet file.
+
+    python score_records.py                                   # records table
+    python score_records.py --source data/financial_data.csv  # CSV dataset
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from utils.scoring import iter_chunks, score_to_parquet
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DB_FILE = os.path.join(DATA_DIR, "db.json")
+
+
+def record_chunks(source: str, chunk_size: int):
+    if source.endswith(".csv"):
+        return pd.read_csv(source, chunksize=chunk_size)
+    with open(source, "r", encoding="utf-8") as fh:
+        records = json.load(fh).get("records", {})
+    return iter_chunks(records.values(), chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every stored record")
+    parser.add_argument("--source", default=DB_FILE, help="TinyDB json file or CSV dataset")
+    parser.add_argument("--out", default=os.path.join(DATA_DIR, "scores.parquet"))
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = score_to_parquet(record_chunks(args.source, args.chunk_size), args.out)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} records in {elapsed:.2f}s -> {args.out}")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
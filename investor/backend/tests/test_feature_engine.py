@@ -0,0 +1,88 @@
+import pytest
+
+from utils.feature_engine import FeatureEngine, compare_with_batch
+from utils.market_frame import MarketFrame
+from utils.market_provider import ReplayProvider, generate_fixtures
+
+SYMBOLS = ['AAA', 'BBB', 'CCC']
+
+
+@pytest.fixture(scope='module')
+def provider(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('fixtures')
+    generate_fixtures(directory, SYMBOLS, days=400, seed=7)
+    return ReplayProvider(fixtures_dir=directory)
+
+
+def assert_matches_batch(row, bars):
+    expected = MarketFrame('', bars).features().iloc[-1]
+    assert row is not None
+    for col, value in expected.items():
+        assert row[col] == float(value), col
+
+
+@pytest.mark.parametrize('symbol', SYMBOLS)
+@pytest.mark.parametrize('revise_last', [True, False])
+def test_incremental_rows_equal_batch(provider, symbol, revise_last):
+    bars = provider.history(symbol, period='2y')
+    assert len(bars) > 100
+    assert compare_with_batch(bars, revise_last=revise_last) == 0.0
+
+
+def test_provisional_last_bar_is_revised_from_checkpoint(provider):
+    bars = provider.history('AAA', period='2y')
+    provisional = bars.copy()
+    provisional.iloc[-1, provisional.columns.get_loc('Close')] *= 1.02
+
+    engine = FeatureEngine(store=None)
+    engine.update('AAA', provisional)
+    row = engine.update('AAA', bars)
+
+    stats = engine.stats()
+    assert stats['revisions'] == 1
+    assert stats['rebuilds'] == 1
+    assert stats['bars_pushed'] == len(bars) + 1
+    assert_matches_batch(row, bars)
+
+
+def test_new_bars_are_pushed_incrementally(provider):
+    bars = provider.history('BBB', period='2y')
+    engine = FeatureEngine(store=None)
+    engine.update('BBB', bars.iloc[:-5])
+    row = engine.update('BBB', bars)
+    assert engine.update('BBB', bars) == row
+
+    stats = engine.stats()
+    assert stats['rebuilds'] == 1
+    assert stats['unchanged'] == 1
+    assert stats['bars_pushed'] == len(bars)
+    assert_matches_batch(row, bars)
+
+
+def test_gap_in_history_rebuilds_state(provider):
+    bars = provider.history('CCC', period='2y')
+    engine = FeatureEngine(store=None)
+    engine.update('CCC', bars.iloc[:300])
+    last_ts = engine.last_timestamp('CCC')
+
+    # The stored history no longer contains the bar the state ended on
+    gapped = bars.iloc[:320].drop(last_ts)
+    row = engine.update('CCC', gapped)
+
+    assert engine.stats()['rebuilds'] == 2
+    assert engine.last_timestamp('CCC') == gapped.index[-1]
+    assert_matches_batch(row, gapped)
+
+
+def test_changed_earlier_bar_rebuilds_state(provider):
+    bars = provider.history('AAA', period='2y')
+    engine = FeatureEngine(store=None)
+    engine.update('AAA', bars.iloc[:300])
+
+    revised = bars.iloc[:310].copy()
+    revised.iloc[299, revised.columns.get_loc('Close')] *= 0.98
+    row = engine.update('AAA', revised)
+
+    assert engine.stats()['rebuilds'] == 2
+    assert engine.stats()['revisions'] == 0
+    assert_matches_batch(row, revised)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from utils.goal_engine import MAX_GRID_CELLS, grid_axes, grid_axis, inflate, required_sip, sip_grid, step_up_factor
+
+
+def brute_force_value(sip, current_saved, months, monthly_rate, step_up):
+    """Month-by-month future value with end-of-month payments"""
+    balance = current_saved
+    for m in range(int(months)):
+        balance = balance * (1 + monthly_rate) + sip * (1 + step_up) ** (m // 12)
+    return balance
+
+
+def expected_target(target, current_saved, months, monthly_rate, inflation):
+    """What the solved SIP should reach: the inflated target, or the grown lump sum if larger"""
+    return max(float(inflate(target, inflation, months)), current_saved * (1 + monthly_rate) ** months)
+
+
+# (monthly_rate, step_up, months)
+FACTOR_CASES = [
+    (0.008, 0.0, 120),
+    (0.008, 0.10, 120),
+    (0.008, 0.10, 127),           # trailing partial year
+    (0.0, 0.0, 60),               # r == 0
+    (0.0, 0.07, 67),              # r == 0 with step-up
+    (0.01, 1.01 ** 12 - 1, 96),   # q == 1 + g
+    (0.012, 0.15, 5),             # shorter than a year
+]
+
+
+@pytest.mark.parametrize('rate, step_up, months', FACTOR_CASES)
+def test_step_up_factor_matches_brute_force(rate, step_up, months):
+    want = brute_force_value(1.0, 0.0, months, rate, step_up)
+    assert float(step_up_factor(rate, step_up, months)) == pytest.approx(want, rel=1e-10)
+
+
+# (target, current_saved, months, monthly_rate, step_up, inflation)
+SIP_CASES = [
+    (1_000_000, 0, 120, 0.008, 0.0, 0.0),
+    (1_000_000, 0, 120, 0.008, 0.10, 0.0),             # step-up
+    (1_000_000, 0, 120, 0.008, 0.0, 0.06),             # inflation
+    (1_000_000, 200_000, 120, 0.008, 0.0, 0.0),        # lump sum
+    (1_000_000, 150_000, 127, 0.008, 0.10, 0.06),      # all together
+    (500_000, 50_000, 60, 0.0, 0.05, 0.04),            # r == 0
+    (2_000_000, 100_000, 96, 0.01, 1.01 ** 12 - 1, 0.05),  # q == 1 + g
+    (100_000, 500_000, 36, 0.008, 0.0, 0.0),           # lump sum already enough
+]
+
+
+@pytest.mark.parametrize('target, saved, months, rate, step_up, inflation', SIP_CASES)
+def test_required_sip_reaches_target(target, saved, months, rate, step_up, inflation):
+    sip = float(required_sip(target, saved, months, rate, step_up, inflation))
+    assert sip >= 0
+    fv = brute_force_value(sip, saved, months, rate, step_up)
+    assert fv == pytest.approx(expected_target(target, saved, months, rate, inflation), rel=1e-9)
+
+
+def test_vectorized_solver_matches_brute_force():
+    rng = np.random.default_rng(7)
+    n = 300
+    targets = rng.uniform(1e5, 5e7, n)
+    saved = rng.uniform(0, 5e5, n)
+    months = rng.integers(1, 361, n)
+    rates = rng.choice([0.0, 0.004, 0.008, 0.012], n)
+    step_up = rng.choice([0.0, 0.05, 0.10, 0.15], n)
+    inflation = rng.uniform(0, 0.08, n)
+
+    sips = required_sip(targets, saved, months, rates, step_up, inflation)
+    for i in range(n):
+        fv = brute_force_value(sips[i], saved[i], months[i], rates[i], step_up[i])
+        want = expected_target(targets[i], saved[i], months[i], rates[i], inflation[i])
+        assert fv == pytest.approx(want, rel=1e-9)
+
+
+def test_grid_axis_rejects_oversized_num_before_allocating():
+    with pytest.raises(ValueError):
+        grid_axis({'start': 0, 'stop': 1, 'num': 10 ** 12}, None)
+    with pytest.raises(ValueError):
+        grid_axis({'start': 0, 'stop': 1, 'num': 0}, None)
+
+
+def test_grid_axes_rejects_oversized_product():
+    side = {'start': 0, 'stop': 1, 'num': 1000}
+    with pytest.raises(ValueError):
+        grid_axes((side, None), (side, None), ([0, 1], None))
+    rates, years, steps = grid_axes((side, None), (None, [1, 2, 3]), (0.05, None))
+    assert (rates.size, years.size, steps.size) == (1000, 3, 1)
+    assert rates.size * years.size * steps.size <= MAX_GRID_CELLS
+
+
+def test_sip_grid_matches_required_sip():
+    grid = sip_grid(1_000_000, [0.08, 0.12], [5, 10], [0.0, 0.1], current_saved=50_000, inflation=0.05)
+    assert grid.shape == (2, 2, 2)
+    for i, rate in enumerate([0.08, 0.12]):
+        for j, years in enumerate([5, 10]):
+            for k, step_up in enumerate([0.0, 0.1]):
+                want = required_sip(1_000_000, 50_000, 12 * years, rate / 12, step_up, 0.05)
+                assert grid[i, j, k] == pytest.approx(float(want))
@@ -0,0 +1,45 @@
+import pytest
+
+from utils.goal_engine import inflate, project_balances, required_sip, sip_schedule
+from utils.goal_simulator import simulate_goal
+
+# (target, current_saved, months, monthly_rate, step_up, inflation)
+CASES = [
+    (1_000_000, 0, 120, 0.01, 0.0, 0.0),        # the /goal-plan defaults
+    (1_000_000, 150_000, 127, 0.008, 0.10, 0.06),
+    (500_000, 20_000, 36, 0.012, 0.05, 0.0),
+]
+
+
+@pytest.mark.parametrize('target, saved, months, rate, step_up, inflation', CASES)
+def test_zero_volatility_matches_deterministic_plan(target, saved, months, rate, step_up, inflation):
+    sip = float(required_sip(target, saved, months, rate, step_up, inflation))
+    contributions = sip_schedule(sip, step_up, [months])
+    expected = float(project_balances(contributions, saved, [months], rate, payments_at_end=True)[0, -1])
+    assert expected == pytest.approx(float(inflate(target, inflation, months)), rel=1e-9)
+
+    kwargs = dict(target=target, months=months, current_saved=saved, monthly_rate=rate,
+                  annual_volatility=1e-9, step_up=step_up, inflation=inflation, n_paths=2000)
+    result = simulate_goal(sip=sip, **kwargs)
+    assert result['median_final_balance'] == pytest.approx(expected, rel=1e-6)
+    assert result['sip_for_confidence'] == pytest.approx(sip, abs=0.01)
+    # Paths scatter around the target by ~1e-9, so a hair above the solved SIP always succeeds
+    assert simulate_goal(sip=sip * (1 + 1e-6), **kwargs)['success_probability'] == 1.0
+    assert simulate_goal(sip=sip * (1 - 1e-6), **kwargs)['success_probability'] == 0.0
+
+
+def test_volatility_spreads_outcomes_around_the_plan():
+    sip = float(required_sip(1_000_000, 0, 120, 0.01))
+    result = simulate_goal(1_000_000, 120, sip, monthly_rate=0.01, annual_volatility=0.15, n_paths=20000)
+    bands = result['percentile_bands']
+    assert bands['months'][-1] == 120
+    assert bands['p5'][-1] < 1_000_000 < bands['p95'][-1]
+    assert 0.2 < result['success_probability'] < 0.8
+    assert result['sip_for_confidence'] > sip
+
+
+def test_same_seed_gives_same_result():
+    args = (2_000_000, 180, 6000)
+    a = simulate_goal(*args, n_paths=6000, chunk_size=1500, seed=3)
+    assert a == simulate_goal(*args, n_paths=6000, chunk_size=1500, seed=3)
+    assert a != simulate_goal(*args, n_paths=6000, chunk_size=1500, seed=4)
@@ -0,0 +1,40 @@
+import pytest
+
+from utils.live_data_service import LiveDataService
+from utils.market_provider import ReplayProvider, generate_fixtures
+
+SYMBOLS = ['AAA', 'BBB', 'CCC']
+
+
+@pytest.fixture
+def service(tmp_path):
+    generate_fixtures(tmp_path, SYMBOLS, days=60)
+    return LiveDataService(provider=ReplayProvider(fixtures_dir=tmp_path))
+
+
+def test_fresh_quotes_are_not_reported_stale(service):
+    first = service.fan_out_quotes(SYMBOLS, deadline=10)
+    assert first['complete'] and first['missing'] == []
+
+    again = service.fan_out_quotes(SYMBOLS, deadline=10)
+    assert again['stale'] == []
+    assert again['complete']
+    assert not any(q.get('stale') for q in again['quotes'].values())
+
+
+def test_expired_quotes_are_served_stale(service):
+    service.fan_out_quotes(SYMBOLS, deadline=10)
+    quote = service.cache.get('AAA_1d')
+    service.cache.set('AAA_1d', quote, ttl=-1)
+
+    report = service.fan_out_quotes(SYMBOLS, deadline=10)
+    assert report['stale'] == ['AAA']
+    assert report['quotes']['AAA']['stale'] is True
+    assert not report['complete']
+
+
+
+def test_dashboard_quotes_carry_company_info(service):
+    quotes = service.fan_out_quotes(SYMBOLS, deadline=10)['quotes']
+    assert all(q['market_state'] != 'UNKNOWN' for q in quotes.values())
+    assert service.cache.get('AAA_info') is not None
@@ -0,0 +1,35 @@
+from utils.market_cache import MarketCache
+
+
+def test_get_stale_returns_only_expired_entries():
+    cache = MarketCache(max_stale=60)
+    cache.set('fresh', {'price': 1}, ttl=60)
+    cache.set('expired', {'price': 2}, ttl=-1)
+    cache.set('too_old', {'price': 3}, ttl=-120)
+
+    assert cache.get('fresh') == {'price': 1}
+    assert cache.get_stale('fresh') is None
+    assert cache.get('expired') is None
+    assert cache.get_stale('expired') == {'price': 2}
+    assert cache.get_stale('expired', max_stale=0.5) is None
+    assert cache.get_stale('too_old') is None
+
+
+def test_clear_removes_disk_tier(tmp_path):
+    cache = MarketCache(disk_dir=str(tmp_path))
+    cache.set('AAA_1d', {'price': 1})
+    cache.set('BBB_info', {'longName': 'B'}, kind='info')
+    assert len(list(tmp_path.iterdir())) == 2
+
+    cache.clear()
+    assert len(cache) == 0
+    assert list(tmp_path.iterdir()) == []
+    assert cache.get('AAA_1d') is None
+    assert MarketCache(disk_dir=str(tmp_path)).get('BBB_info') is None
+
+
+def test_disk_tier_survives_memory_loss(tmp_path):
+    MarketCache(disk_dir=str(tmp_path)).set('AAA_1d', {'price': 1})
+    restarted = MarketCache(disk_dir=str(tmp_path))
+    assert restarted.get('AAA_1d') == {'price': 1}
+    assert restarted.stats()['disk_hits'] == 1
@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+
+from utils.peer_index import PeerIndex
+
+
+def make_records(start, n, rng):
+    income = rng.uniform(2e4, 3e5, n)
+    return [
+        {'id': start + i, 'income': float(income[i]), 'expenses': float(income[i] * rng.uniform(0.3, 1.1)),
+         'age': int(rng.integers(18, 80))}
+        for i in range(n)
+    ]
+
+
+def test_percentile_matches_sorted_sample():
+    rng = np.random.default_rng(1)
+    records = make_records(1, 5000, rng)
+    index = PeerIndex()
+    assert index.add_records(records) == 5000
+    assert index.add_records(records) == 0
+
+    incomes = np.sort([r['income'] for r in records])
+    result = index.percentile('income', float(np.median(incomes)))
+    assert result['sample_size'] == 5000
+    assert abs(result['percentile'] - 50) < 2
+
+
+def test_concurrent_updates_and_queries_stay_consistent():
+    rng = np.random.default_rng(2)
+    batches = [make_records(1 + 200 * b, 200, rng) for b in range(20)]
+    index = PeerIndex()
+    stop = threading.Event()
+
+    def query():
+        while not stop.is_set():
+            for age in (None, 30, 50):
+                index.percentile('savings_rate', 10.0, age)
+                index.percentile('income', 5e4, age)
+
+    readers = [threading.Thread(target=query) for _ in range(4)]
+    for t in readers:
+        t.start()
+    # Every batch is submitted twice, as overlapping /predict requests would
+    writers = [threading.Thread(target=lambda b=b: index.add_records(sum(batches[:b + 1], [])))
+               for b in range(len(batches)) for _ in range(2)]
+    for t in writers:
+        t.start()
+    for t in writers:
+        t.join()
+    stop.set()
+    for t in readers:
+        t.join()
+
+    # No record counted twice, and no cached prefix left over from a half-applied batch
+    assert int(index.counts['income'].sum()) == 4000
+    assert index.percentile('income', 5e4)['sample_size'] == 4000
+    assert index.percentile('savings_rate', 10.0)['sample_size'] == 4000
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from utils.enhanced_ml_advisor import enhanced_ml_advisor
+from utils.training_jobs import ACTIVE_STATES, TrainingJobManager
+
+
+@pytest.fixture
+def manager():
+    jobs = TrainingJobManager(max_workers=1)
+    yield jobs
+    jobs._pool.shutdown(wait=True)
+    if jobs._manager is not None:
+        jobs._manager.shutdown()
+
+
+def wait_for(manager, job_id, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job['status'] not in ACTIVE_STATES:
+            return job
+        time.sleep(0.2)
+    pytest.fail(f"job {job_id} still {manager.get(job_id)['status']} after {timeout}s")
+
+
+def test_job_runs_to_completion_on_spawn_pool(manager, tmp_path, monkeypatch):
+    model_path = tmp_path / 'enhanced.pkl'
+    monkeypatch.setattr(enhanced_ml_advisor, 'model_path', str(model_path))
+
+    job = manager.submit('enhanced_allocation', {'n_samples': 1000})
+    assert job['status'] == 'queued'
+    # A second submission while the first is active returns the same job
+    assert manager.submit('enhanced_allocation', {'n_samples': 1000})['id'] == job['id']
+
+    done = wait_for(manager, job['id'])
+    assert done['status'] == 'succeeded', done['error']
+    assert done['progress'] == 1.0
+    assert done['result'] == {'artifact': str(model_path)}
+    assert model_path.exists()
+    assert manager.stats()['start_method'] == 'spawn'
+    assert manager._futures == {}
+
+
+def test_invalid_parameters_are_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.submit('stock', {'symbol': ''})
+    with pytest.raises(ValueError):
+        manager.submit('enhanced_allocation', {'n_samples': 10})
+    with pytest.raises(ValueError):
+        manager.submit('unknown', {})
@@ -0,0 +1,243 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from utils.market_frame import FEATURE_COLUMNS, market_frames
+from utils.process_pool import SharedProcessPool
+from utils.single_flight import SingleFlight
+
+TRADING_DAYS = 252
+# Upper bound on trees fitted by one backtest (windows x n_estimators)
+MAX_TREES = int(os.environ.get('BACKTEST_MAX_TREES', 25000))
+
+DEFAULT_CONFIG = {
+    'period': '2y',
+    'window': 'expanding',   # or 'rolling': train on the last `train_size` rows only
+    'train_size': 250,       # rows in the first (or every rolling) training window
+    'retrain_every': 20,     # rows predicted by each fitted model before retraining
+    'target_days': 5,        # same horizon as StockPredictor.train_model
+    'n_estimators': 100,
+    'max_depth': 10,
+    'cost_bps': 5.0,         # trading cost per unit of position change
+    'long_only': False,
+}
+
+
+def normalize_config(config: Optional[Dict] = None) -> Dict:
+    """Defaults merged with `config`; raises ValueError on bad values"""
+    cfg = {**DEFAULT_CONFIG, **{k: v for k, v in (config or {}).items() if v is not None}}
+    unknown = set(cfg) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown backtest settings: {sorted(unknown)}")
+    if cfg['window'] not in ('expanding', 'rolling'):
+        raise ValueError("window must be 'expanding' or 'rolling'")
+    if cfg['period'] not in ('1y', '2y', '5y', '10y', 'max'):
+        raise ValueError("period must be one of 1y, 2y, 5y, 10y, max")
+    for key, low, high in (('train_size', 60, 5000), ('retrain_every', 1, 500), ('target_days', 1, 60),
+                           ('n_estimators', 10, 500), ('max_depth', 2, 30)):
+        cfg[key] = int(cfg[key])
+        if not low <= cfg[key] <= high:
+            raise ValueError(f"{key} must be between {low} and {high}")
+    cfg['cost_bps'] = float(cfg['cost_bps'])
+    if cfg['cost_bps'] < 0:
+        raise ValueError("cost_bps must not be negative")
+    cfg['long_only'] = str(cfg['long_only']).lower() in ('1', 'true', 'yes')
+    return cfg
+
+
+def walk_forward_windows(n_rows: int, cfg: Dict) -> List[Tuple[int, int, int, int]]:
+    """
+    (train_start, train_end, test_start, test_end) row ranges, end-exclusive.
+    A row's label is the close `target_days` later, so training rows stop
+    `target_days` before the test block: every label the model sees was
+    known when the first test prediction is made.
+    """
+    h, size, step = cfg['target_days'], cfg['train_size'], cfg['retrain_every']
+    windows = []
+    for test_start in range(size + h, n_rows, step):
+        train_end = test_start - h
+        train_start = 0 if cfg['window'] == 'expanding' else train_end - size
+        windows.append((train_start, train_end, test_start, min(test_start + step, n_rows)))
+    return windows
+
+
+def _fit_window(args) -> np.ndarray:
+    """Fit the production model recipe on one training window and predict its test block"""
+    X_train, y_train, X_test, n_estimators, max_depth, n_jobs = args
+    scaler = StandardScaler()
+    model = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=42, n_jobs=n_jobs)
+    model.fit(scaler.fit_transform(X_train), y_train)
+    return model.predict(scaler.transform(X_test))
+
+
+def evaluate(close: np.ndarray, future: np.ndarray, next_close: np.ndarray, predicted: np.ndarray,
+             cfg: Dict) -> Dict:
+    """
+    Out-of-sample scores for the rows that have a prediction. Positions are
+    taken at each close from the predicted direction and held to the next
+    close; costs are charged on every change of position.
+    """
+    tested = ~np.isnan(predicted)
+    close, future, predicted = close[tested], future[tested], predicted[tested]
+    next_close = next_close[tested]
+    predicted_return = predicted / close - 1
+    actual_return = future / close - 1
+
+    hits = np.sign(predicted_return) == np.sign(actual_return)
+    residual = np.sum((actual_return - predicted_return) ** 2)
+    total = np.sum((actual_return - actual_return.mean()) ** 2)
+
+    if cfg['long_only']:
+        position = (predicted_return > 0).astype(float)
+    else:
+        position = np.sign(predicted_return)
+    daily = next_close / close - 1
+    turnover = np.abs(np.diff(position, prepend=0.0))
+    pnl = position * daily - turnover * cfg['cost_bps'] / 10000
+    equity = np.cumprod(1 + pnl)
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+    vol = pnl.std()
+
+    return {
+        'predictions': int(tested.sum()),
+        'directional_accuracy': float(hits.mean()),
+        'r2_return': float(1 - residual / total) if total > 0 else None,
+        'mae_pct': float(np.mean(np.abs(actual_return - predicted_return)) * 100),
+        'total_return_pct': float((equity[-1] - 1) * 100),
+        'buy_hold_return_pct': float((close[-1] / close[0] - 1) * 100),
+        'sharpe': float(pnl.mean() / vol * np.sqrt(TRADING_DAYS)) if vol > 0 else None,
+        'max_drawdown_pct': float(drawdown.max() * 100),
+        'exposure': float(np.mean(np.abs(position))),
+        'trades': int(np.count_nonzero(turnover)),
+        '_hits': hits,
+        '_equity': equity,
+    }
+
+
+class WalkForwardBacktester:
+    """
+    Walk-forward evaluation of the stock predictor's model recipe.
+
+    The feature table is split into consecutive test blocks; for each block
+    a model is trained only on rows before it (expanding from the start or
+    a rolling window of fixed size) and predicts the block. Blocks are
+    independent, so they are fitted in one process pool shared by all
+    runs; a run whose windows x n_estimators exceeds MAX_TREES is refused
+    before any work starts. Scoring is a few vectorized passes over all
+    out-of-sample predictions. Results are kept per (symbol, config)
+    together with the bar set they were computed on, and reused until a
+    new bar arrives; identical runs that arrive together share one
+    computation.
+    """
+
+    def __init__(self, frames=market_frames, workers: int = 0, max_results: int = 128,
+                 max_trees: int = MAX_TREES):
+        self.frames = frames
+        self.workers = min(workers or 4, os.cpu_count() or 1)
+        self.max_results = max_results
+        self.max_trees = max_trees
+        self._results: 'OrderedDict[Tuple, Tuple[Tuple, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = SharedProcessPool(self.workers, name="Backtest")
+        self._flights = SingleFlight()
+        self._stats = {'runs': 0, 'hits': 0}
+
+    def run(self, symbol: str, config: Optional[Dict] = None) -> Optional[Dict]:
+        cfg = normalize_config(config)
+        symbol = symbol.upper()
+        frame = self.frames.get(symbol, cfg['period'])
+        if frame is None:
+            return None
+        key = (symbol, tuple(sorted(cfg.items())))
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == frame.signature:
+                self._results.move_to_end(key)
+                self._stats['hits'] += 1
+                return cached[1]
+
+        flight = repr((key, frame.signature))
+        return self._flights.do(flight, self._compute, symbol, frame, cfg, key)
+
+    def _compute(self, symbol: str, frame, cfg: Dict, key: Tuple) -> Optional[Dict]:
+        result = self.run_on_features(symbol, frame.features(), cfg)
+        if result is not None:
+            with self._lock:
+                self._results[key] = (frame.signature, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+                self._stats['runs'] += 1
+        return result
+
+    def run_on_features(self, symbol: str, df: pd.DataFrame, cfg: Dict) -> Optional[Dict]:
+        h = cfg['target_days']
+        X = df[FEATURE_COLUMNS].values
+        close = df['Close'].values
+        # Rows whose label (the close h days later) is known
+        n = len(df) - h
+        if n <= 0:
+            return None
+        future = close[h:]
+        windows = walk_forward_windows(n, cfg)
+        if not windows:
+            return None
+        trees = len(windows) * cfg['n_estimators']
+        if trees > self.max_trees:
+            raise ValueError(
+                f"Backtest too large: {len(windows)} windows x {cfg['n_estimators']} trees exceeds "
+                f"{self.max_trees}; raise retrain_every, lower n_estimators or use a shorter period"
+            )
+
+        # One core per window in the pool; a single in-process fit may use them all
+        n_jobs = 1 if self.workers > 1 and len(windows) > 1 else -1
+        tasks = [
+            (X[a:b], future[a:b], X[c:d], cfg['n_estimators'], cfg['max_depth'], n_jobs)
+            for a, b, c, d in windows
+        ]
+        blocks = self._pool.map(_fit_window, tasks)
+
+        predicted = np.full(n, np.nan)
+        for (_, _, c, d), block in zip(windows, blocks):
+            predicted[c:d] = block
+        scores = evaluate(close[:n], future, close[1:n + 1], predicted, cfg)
+        hits, equity = scores.pop('_hits'), scores.pop('_equity')
+
+        dates = df.index[:n]
+        first = windows[0][2]
+        per_window = [
+            {
+                'train_rows': b - a,
+                'test_from': str(dates[c].date()),
+                'test_to': str(dates[d - 1].date()),
+                'directional_accuracy': float(hits[c - first:d - first].mean()),
+            }
+            for a, b, c, d in windows
+        ]
+        stride = max(1, len(equity) // 250)
+        return {
+            'symbol': symbol,
+            'config': cfg,
+            'windows': len(windows),
+            **scores,
+            'per_window': per_window,
+            'equity_curve': [
+                {'date': str(dates[first + i].date()), 'equity': round(float(equity[i]), 6)}
+                for i in range(0, len(equity), stride)
+            ],
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {**self._stats, 'cached': len(self._results), 'workers': self.workers}
+        return {**stats, 'flights': self._flights.stats()}
+
+
+# Global instance
+backtester = WalkForwardBacktester(workers=int(os.environ.get('BACKTEST_WORKERS', 0)))
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.multioutput import MultiOutputRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import joblib
@@ -15,6 +16,7 @@ class EnhancedMLAdvisor:
         self.allocation_model = None
         self.scaler = StandardScaler()
         self.model_path = os.path.join(os.path.dirname(__file__), '..', 'enhanced_ml_model.pkl')
+        self._loaded_mtime = None
         
     def create_enhanced_dataset(self, n_samples: int = 100000) -> pd.DataFrame:
         """Create enhanced dataset with simulated market conditions"""
@@ -92,9 +94,11 @@ class EnhancedMLAdvisor:
         ]
         return pd.DataFrame(rows, columns=columns)
     
-    def train_enhanced_model(self, n_samples: int = 100000):
-        """Train the offline enhanced ML model"""
+    def train_enhanced_model(self, n_samples: int = 100000, progress=None):
+        """Train the offline enhanced ML model; `progress(fraction, stage)` reports each stage"""
+        report = progress or (lambda fraction, stage: None)
         print("Creating simulated dataset...")
+        report(0.0, 'dataset')
         df = self.create_enhanced_dataset(n_samples)
         
         feature_columns = ['Income', 'Expenses', 'Age', 'RiskTolerance', 
@@ -105,36 +109,50 @@ class EnhancedMLAdvisor:
         y = df[target_columns]
         
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        report(0.2, 'fitting')
         
-        self.allocation_model = GradientBoostingRegressor(
+        # Gradient boosting is single-output, so fit one booster per target column
+        model = MultiOutputRegressor(GradientBoostingRegressor(
             n_estimators=200, learning_rate=0.1, max_depth=8, random_state=42
-        )
-        self.allocation_model.fit(X_train_scaled, y_train)
+        ))
+        model.fit(X_train_scaled, y_train)
+        report(0.9, 'evaluating')
         
-        print(f"Training R²: {self.allocation_model.score(X_train_scaled, y_train):.4f}")
-        print(f"Test R²: {self.allocation_model.score(X_test_scaled, y_test):.4f}")
+        print(f"Training R²: {model.score(X_train_scaled, y_train):.4f}")
+        print(f"Test R²: {model.score(X_test_scaled, y_test):.4f}")
+        report(0.95, 'publishing')
         
+        # Write to a temp file and rename so a serving process never loads a partial model
+        tmp_path = f"{self.model_path}.{os.getpid()}.tmp"
         joblib.dump({
-            'allocation_model': self.allocation_model,
-            'scaler': self.scaler,
+            'allocation_model': model,
+            'scaler': scaler,
             'feature_columns': feature_columns,
             'target_columns': target_columns,
             'trained_at': datetime.now().isoformat()
-        }, self.model_path)
+        }, tmp_path)
+        os.replace(tmp_path, self.model_path)
+        self.allocation_model, self.scaler = model, scaler
+        self._loaded_mtime = os.path.getmtime(self.model_path)
         
         print(f"Offline model saved at: {self.model_path}")
         return True
     
     def load_enhanced_model(self) -> bool:
-        """Load saved offline model"""
-        if os.path.exists(self.model_path):
-            model_data = joblib.load(self.model_path)
-            self.allocation_model = model_data['allocation_model']
-            self.scaler = model_data['scaler']
+        """Load saved offline model (only re-read from disk when a new one was published)"""
+        if not os.path.exists(self.model_path):
+            return self.allocation_model is not None
+        mtime = os.path.getmtime(self.model_path)
+        if self.allocation_model is not None and mtime == self._loaded_mtime:
             return True
-        return False
+        model_data = joblib.load(self.model_path)
+        self.allocation_model = model_data['allocation_model']
+        self.scaler = model_data['scaler']
+        self._loaded_mtime = mtime
+        return True
     
     def _get_default_market_conditions(self) -> Dict:
         """Simulated market snapshot"""
@@ -147,9 +165,10 @@ class EnhancedMLAdvisor:
     def predict_enhanced_allocation(self, income: float, expenses: float, age: int, risk_tolerance: int) -> Dict:
         """Predict allocations using simulated market conditions"""
         if not self.load_enhanced_model():
-            print("Model not found — training a new one...")
-            self.train_enhanced_model()
-            self.load_enhanced_model()
+            # Never train inside a request: queue a background job and let the caller fall back
+            from utils.training_jobs import training_jobs
+            job = training_jobs.submit('enhanced_allocation', {})
+            raise RuntimeError(f"Enhanced model not trained yet (training job {job['id']} is {job['status']})")
         
         market = self._get_default_market_conditions()
         
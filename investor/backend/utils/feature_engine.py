@@ -0,0 +1,341 @@
+import copy
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.history_store import history_store
+from utils.market_frame import MarketFrame
+
+
+def _div(a: float, b: float) -> float:
+    """IEEE division (inf/nan on a zero divisor), as pandas does for whole columns"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class _RollingMean:
+    """
+    Fixed-window mean updated one value at a time with the same compensated
+    add/remove steps as pandas' rolling mean, so values match bit for bit.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same = 0
+        self.prev = None
+
+    def push(self, value: float) -> float:
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self._add(value)
+        self.values.append(value)
+        return self.value()
+
+    def _add(self, val: float):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        self.same = self.same + 1 if val == self.prev else 1
+        self.prev = val
+
+    def _remove(self, val: float):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def value(self) -> float:
+        if self.nobs < self.window or self.nobs == 0:
+            return math.nan
+        if self.same >= self.nobs:
+            return self.prev
+        result = self.sum_x / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class _RollingStd:
+    """Fixed-window sample std (ddof=1) with pandas' compensated Welford updates"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same = 0
+        self.prev = None
+
+    def push(self, value: float) -> float:
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self._add(value)
+        self.values.append(value)
+        return self.value()
+
+    def _add(self, val: float):
+        if val != val:
+            return
+        self.same = self.same + 1 if val == self.prev else 1
+        self.prev = val
+        self.nobs += 1
+        prev_mean = self.mean_x - self.comp_add
+        y = val - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.comp_remove
+            y = val - self.comp_remove
+            t = y - self.mean_x
+            self.comp_remove = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def value(self) -> float:
+        if self.nobs < self.window or self.nobs <= 1:
+            return math.nan
+        if self.same >= self.nobs:
+            return 0.0
+        var = self.ssqdm_x / (self.nobs - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class _Ewm:
+    """Adjusted exponentially weighted mean (pandas `ewm(span=...).mean()`), one value at a time"""
+
+    def __init__(self, span: int):
+        com = (span - 1) / 2.0
+        self.factor = 1.0 - 1.0 / (1.0 + com)
+        self.weighted = math.nan
+        self.old_wt = 1.0
+
+    def push(self, cur: float) -> float:
+        if self.weighted != self.weighted:
+            self.weighted = cur
+            return self.weighted
+        self.old_wt *= self.factor
+        if self.weighted != cur:
+            self.weighted = ((self.old_wt * self.weighted) + cur) / (self.old_wt + 1.0)
+        self.old_wt += 1.0
+        return self.weighted
+
+
+class FeatureState:
+    """
+    Running indicator state for one symbol. `push` consumes one daily bar in
+    O(1) and returns that bar's feature row (or None while the warm-up
+    windows are still filling), equal to the matching row of
+    `MarketFrame.features()` computed over the same bars.
+    """
+
+    def __init__(self):
+        self.closes: deque = deque(maxlen=21)
+        self.sma = {w: _RollingMean(w) for w in (5, 20, 50)}
+        self.std = _RollingStd(20)
+        self.gain = _RollingMean(14)
+        self.loss = _RollingMean(14)
+        self.ema_fast = _Ewm(12)
+        self.ema_slow = _Ewm(26)
+        self.signal = _Ewm(9)
+        self.volume_sma = _RollingMean(20)
+        self.last_ts = None
+        self.last_bar = None
+        self.row: Optional[Dict] = None
+
+    def _change(self, close: float, periods: int) -> float:
+        if len(self.closes) <= periods:
+            return math.nan
+        return _div(close, self.closes[-1 - periods]) - 1
+
+    def push(self, ts, bar: Dict[str, float]) -> Optional[Dict]:
+        close, volume = bar['Close'], bar['Volume']
+        delta = close - self.closes[-1] if self.closes else math.nan
+        self.closes.append(close)
+
+        row = dict(bar)
+        row['SMA_5'] = self.sma[5].push(close)
+        row['SMA_20'] = self.sma[20].push(close)
+        row['SMA_50'] = self.sma[50].push(close)
+        row['Volatility'] = self.std.push(close)
+        # Same as the batch form: `where` turns the leading NaN diff into 0 and
+        # non-losses into -0.0 after negation
+        gain = self.gain.push(delta if delta > 0 else 0.0)
+        loss = self.loss.push(-(delta if delta < 0 else 0.0))
+        row['RSI'] = 100 - _div(100, 1 + _div(gain, loss))
+        row['MACD'] = self.ema_fast.push(close) - self.ema_slow.push(close)
+        row['MACD_Signal'] = self.signal.push(row['MACD'])
+        row['Price_Change_1d'] = self._change(close, 1)
+        row['Price_Change_5d'] = self._change(close, 5)
+        row['Price_Change_20d'] = self._change(close, 20)
+        row['Volume_SMA'] = self.volume_sma.push(volume)
+        row['Volume_Ratio'] = _div(volume, row['Volume_SMA'])
+
+        self.last_ts, self.last_bar = ts, bar
+        self.row = None if any(v != v for v in row.values()) else row
+        return self.row
+
+
+class FeatureEngine:
+    """
+    Incremental feature rows per symbol.
+
+    The first request for a symbol replays its stored history once; after
+    that each request only pushes the bars that arrived since the last one,
+    so serving the latest feature row costs O(new bars) instead of
+    recomputing every window over the full history. A revised last bar (the
+    live intraday bar) is re-applied from a checkpoint taken just before it.
+    If the stored history no longer continues the state (a refill, or a gap),
+    the symbol is rebuilt from scratch.
+
+    The state is anchored at the first bar it saw, so rows equal the batch
+    features computed over the stored bars from that anchor onwards; see
+    `compare_with_batch`.
+    """
+
+    def __init__(self, store=history_store, period: str = "2y"):
+        self.store = store
+        self.period = period
+        self._states: Dict[str, FeatureState] = {}
+        self._checkpoints: Dict[str, FeatureState] = {}
+        self._lock = threading.Lock()
+        self._stats = {'rebuilds': 0, 'bars_pushed': 0, 'revisions': 0, 'unchanged': 0}
+
+    @staticmethod
+    def _bar(values, i: int) -> Dict[str, float]:
+        return {c: float(values[c][i]) for c in values}
+
+    def update(self, symbol: str, bars: pd.DataFrame) -> Optional[Dict]:
+        """Advance `symbol`'s state to the end of `bars`; latest feature row or None"""
+        if bars is None or bars.empty:
+            return None
+        key = symbol.upper()
+        index = bars.index
+        values = {c: bars[c].to_numpy(dtype=np.float64) for c in bars.columns}
+        with self._lock:
+            state = self._states.get(key)
+            start = 0
+            if state is not None:
+                pos = int(index.searchsorted(state.last_ts))
+                if pos < len(index) and index[pos] == state.last_ts:
+                    if self._bar(values, pos) == state.last_bar:
+                        start = pos + 1
+                    elif pos == len(index) - 1 and key in self._checkpoints:
+                        state = copy.deepcopy(self._checkpoints[key])
+                        start = pos
+                        self._stats['revisions'] += 1
+                    else:
+                        state = None
+                else:
+                    state = None
+            if state is None:
+                state = FeatureState()
+                start = 0
+                self._stats['rebuilds'] += 1
+
+            if start == len(index):
+                self._stats['unchanged'] += 1
+                return state.row
+            for i in range(start, len(index)):
+                if i == len(index) - 1:
+                    self._checkpoints[key] = copy.deepcopy(state)
+                state.push(index[i], self._bar(values, i))
+            self._stats['bars_pushed'] += len(index) - start
+            self._states[key] = state
+            return state.row
+
+    def latest(self, symbol: str, period: Optional[str] = None, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Latest feature row for `symbol`, reading new bars from the history store"""
+        bars = self.store.get_history(symbol, period or self.period, timeout=timeout)
+        return self.update(symbol, bars)
+
+    def last_timestamp(self, symbol: str):
+        """Timestamp of the last bar pushed for `symbol` (None before the first update)"""
+        with self._lock:
+            state = self._states.get(symbol.upper())
+            return state.last_ts if state is not None else None
+
+    def reset(self, symbol: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+                self._checkpoints.clear()
+            else:
+                self._states.pop(symbol.upper(), None)
+                self._checkpoints.pop(symbol.upper(), None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'symbols': len(self._states)}
+
+
+def compare_with_batch(bars: pd.DataFrame, revise_last: bool = True) -> float:
+    """
+    Push `bars` one at a time through a fresh engine and compare every row
+    with the batch `MarketFrame.features()` over the same bars. Returns the
+    largest absolute difference (0.0 when identical); raises AssertionError
+    if the two disagree on which rows have features.
+    """
+    batch = MarketFrame('', bars).features()
+    engine = FeatureEngine(store=None)
+    worst = 0.0
+    seen = 0
+    for i in range(1, len(bars) + 1):
+        window = bars.iloc[:i]
+        if revise_last and i < len(bars):
+            # Feed a provisional version of the bar first, as the live bar would
+            provisional = window.copy()
+            provisional.iloc[-1, provisional.columns.get_loc('Close')] *= 1.01
+            engine.update('CHECK', provisional)
+        row = engine.update('CHECK', window)
+        ts = bars.index[i - 1]
+        assert (row is not None) == (ts in batch.index), f"row presence differs at {ts}"
+        if row is None:
+            continue
+        seen += 1
+        expected = batch.loc[ts]
+        for col in batch.columns:
+            a, b = row[col], float(expected[col])
+            if a != b:
+                worst = max(worst, abs(a - b))
+    assert seen == len(batch), "engine produced fewer rows than the batch"
+    return worst
+
+
+# Global instance
+feature_engine = FeatureEngine()
@@ -0,0 +1,315 @@
+import numpy as np
+from typing import Dict, List, Sequence
+
+# Same monthly return assumptions as the React Goal Wizard
+MONTHLY_RATE_BY_RISK = {
+    'Low': 0.004,
+    'Medium': 0.008,
+    'High': 0.012,
+}
+
+MILESTONE_LEVELS = (0.25, 0.5, 0.75, 1.0)
+
+
+def _as_column(values, n: int) -> np.ndarray:
+    """Broadcast a scalar or sequence to a float column of length n"""
+    arr = np.asarray(values, dtype=float)
+    return np.broadcast_to(arr, (n,)).astype(float).reshape(n, 1)
+
+
+def annuity_factor(monthly_rate, months) -> np.ndarray:
+    """Future value of 1/month paid for `months` months: ((1+r)^n - 1) / r"""
+    r = np.asarray(monthly_rate, dtype=float)
+    n = np.asarray(months, dtype=float)
+    growth = np.power(1 + r, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.where(r == 0, n, (growth - 1) / np.where(r == 0, 1, r))
+    return factor
+
+
+def step_up_factor(monthly_rate, step_up, months) -> np.ndarray:
+    """
+    Future value of a SIP of 1/month that rises by `step_up` every 12 months.
+
+    Year y's twelve payments are worth s(1+g)^y * A12 at the end of that year
+    and then compound for the remaining months, so the full years sum to a
+    geometric series in (1+g)/(1+r)^12; the trailing partial year is a plain
+    annuity at the last stepped-up SIP. With step_up == 0 this reduces to
+    annuity_factor.
+    """
+    r = np.asarray(monthly_rate, dtype=float)
+    g = np.asarray(step_up, dtype=float)
+    n = np.floor(np.asarray(months, dtype=float))
+
+    years = np.floor(n / 12)
+    rem = n - 12 * years
+    q = np.power(1 + r, 12)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        same = np.isclose(q, 1 + g)
+        series = np.where(
+            same,
+            years * np.power(q, years - 1),
+            (np.power(q, years) - np.power(1 + g, years)) / np.where(same, 1, q - (1 + g)),
+        )
+    full_years = annuity_factor(r, 12) * np.power(1 + r, rem) * series
+    partial = np.power(1 + g, years) * annuity_factor(r, rem)
+    return full_years + partial
+
+
+def inflate(amount, annual_inflation, months) -> np.ndarray:
+    """Goal cost in future money after `months` of annual inflation"""
+    return np.asarray(amount, dtype=float) * np.power(
+        1 + np.asarray(annual_inflation, dtype=float), np.asarray(months, dtype=float) / 12
+    )
+
+
+def required_sip(targets, current_saved, months, monthly_rates, step_up=0.0, inflation=0.0) -> np.ndarray:
+    """
+    Starting monthly SIP needed to reach each target, net of the grown lump sum.
+
+    `step_up` is the annual SIP increase and `inflation` the annual rise in
+    goal cost (both fractions); all inputs broadcast, so arrays of goals are
+    solved in one call.
+    """
+    r = np.asarray(monthly_rates, dtype=float)
+    n = np.maximum(1, np.floor(np.asarray(months, dtype=float)))
+    fv_saved = np.asarray(current_saved, dtype=float) * np.power(1 + r, n)
+    remaining = np.maximum(0, inflate(targets, inflation, n) - fv_saved)
+    return remaining / step_up_factor(r, step_up, n)
+
+
+def sip_schedule(sips, step_up, months) -> np.ndarray:
+    """Per-month contributions of a stepped-up SIP, shape (goals, max_months)"""
+    months = np.asarray(months, dtype=int).reshape(-1)
+    horizon = int(months.max()) if months.size else 0
+    year = np.arange(horizon) // 12
+    growth = np.power(1 + _as_column(step_up, months.size), year)
+    return _as_column(sips, months.size) * growth
+
+
+def project_balances(sips, current_saved, months, monthly_rates, payments_at_end: bool = False) -> np.ndarray:
+    """
+    Month-end balance paths for many goals at once, shape (goals, max_months).
+
+    Uses b_m = G_m * (saved + sip * sum_{k<m} 1/G_k) where G is the cumulative
+    product of (1 + r), which is the closed form of the month-by-month loop
+    balance = (balance + sip) * (1 + r). With `payments_at_end` the SIP is
+    paid after the month's growth instead, balance = balance * (1 + r) + sip,
+    the convention `required_sip` solves for. `monthly_rates` may be one rate
+    per goal or a full (goals, months) array of per-month rates, and `sips`
+    one SIP per goal or a (goals, months) contribution schedule. Columns past
+    a goal's own horizon repeat its final balance.
+    """
+    months = np.asarray(months, dtype=int).reshape(-1)
+    n_goals = months.size
+    horizon = int(months.max()) if n_goals else 0
+
+    rates = np.asarray(monthly_rates, dtype=float)
+    if rates.ndim < 2:
+        rates = np.broadcast_to(_as_column(rates, n_goals), (n_goals, horizon))
+    growth = np.cumprod(1 + rates[:, :horizon], axis=1)
+
+    if payments_at_end:
+        discount = 1 / growth
+    else:
+        # 1/G_{k-1} for k = 1..m, with G_0 = 1
+        discount = np.ones_like(growth)
+        discount[:, 1:] = 1 / growth[:, :-1]
+
+    sips = np.asarray(sips, dtype=float)
+    if sips.ndim < 2:
+        sips = _as_column(sips, n_goals)
+    saved = _as_column(current_saved, n_goals)
+    balances = growth * (saved + np.cumsum(sips * discount, axis=1))
+
+    # Freeze each row at its own horizon so the padded tail stays flat
+    col = np.arange(horizon)
+    last_idx = np.maximum(months - 1, 0).reshape(-1, 1)
+    balances = np.take_along_axis(balances, np.minimum(col, last_idx), axis=1)
+    return balances
+
+
+def find_milestones(balances, targets, months, levels: Sequence[float] = MILESTONE_LEVELS) -> Dict:
+    """
+    First month each goal's balance reaches `level * target`.
+
+    Each row is turned into a running maximum of balance/target (sorted, and
+    with the same first-crossing month as the raw path), then offset by its
+    row number so a single flattened searchsorted answers every goal/level.
+    """
+    balances = np.asarray(balances, dtype=float)
+    n_goals, horizon = balances.shape
+    levels = np.asarray(levels, dtype=float)
+    months = np.asarray(months, dtype=int).reshape(-1)
+
+    targets = np.asarray(targets, dtype=float).reshape(-1, 1)
+    safe_targets = np.where(targets > 0, targets, 1.0)
+    ratio = np.maximum.accumulate(balances / safe_targets, axis=1)
+
+    span = max(float(ratio.max(initial=0.0)), float(levels.max(initial=0.0))) + 1.0
+    offsets = np.arange(n_goals, dtype=float).reshape(-1, 1) * span
+    flat = (ratio + offsets).ravel()
+    wanted = (levels.reshape(1, -1) + offsets)
+
+    pos = np.searchsorted(flat, wanted.ravel(), side='left').reshape(n_goals, -1)
+    idx = pos - np.arange(n_goals).reshape(-1, 1) * horizon
+    achieved = idx < months.reshape(-1, 1)
+
+    last = balances[np.arange(n_goals), np.maximum(months - 1, 0)].reshape(-1, 1)
+    hit_balance = np.take_along_axis(balances, np.minimum(idx, horizon - 1), axis=1)
+    return {
+        'month': np.where(achieved, idx + 1, 0),
+        'balance': np.where(achieved, hit_balance, last),
+        'achieved': achieved,
+    }
+
+
+def monthly_rate_for(goal: Dict) -> float:
+    if goal.get('monthly_rate') is not None:
+        return float(goal['monthly_rate'])
+    return MONTHLY_RATE_BY_RISK.get(goal.get('risk', 'Medium'), MONTHLY_RATE_BY_RISK['Medium'])
+
+
+def project_goals(goals: List[Dict], include_rows: bool = True,
+                  levels: Sequence[float] = MILESTONE_LEVELS) -> List[Dict]:
+    """
+    Project many goals in one vectorized pass.
+
+    Each goal takes `target`, `months`, optional `currentSaved`, `risk` or
+    `monthly_rate`, `stepUp` and `inflation` (annual fractions), and `sip`
+    (solved for when omitted). Output rows and milestones have the same
+    shape as the Goal Wizard's; milestones are measured against the
+    inflation-adjusted target.
+    """
+    if not goals:
+        return []
+
+    targets = np.array([float(g.get('target', 0)) for g in goals])
+    months = np.array([max(1, int(g.get('months', 1))) for g in goals])
+    saved = np.array([float(g.get('currentSaved', 0) or 0) for g in goals])
+    rates = np.array([monthly_rate_for(g) for g in goals])
+    step_up = np.array([float(g.get('stepUp', 0) or 0) for g in goals])
+    inflation = np.array([float(g.get('inflation', 0) or 0) for g in goals])
+    if (targets <= 0).any():
+        raise ValueError("target must be greater than 0")
+
+    sips = required_sip(targets, saved, months, rates, step_up, inflation)
+    given = np.array([g.get('sip') is not None for g in goals])
+    if given.any():
+        sips = np.where(given, [float(g.get('sip') or 0) for g in goals], sips)
+
+    future_targets = inflate(targets, inflation, months)
+    contributions = sip_schedule(sips, step_up, months)
+    balances = project_balances(contributions, saved, months, rates)
+    milestones = find_milestones(balances, future_targets, months, levels)
+
+    results = []
+    for i, goal in enumerate(goals):
+        n = int(months[i])
+        result = {
+            'name': goal.get('name'),
+            'target': float(targets[i]),
+            'inflated_target': round(float(future_targets[i]), 2),
+            'months': n,
+            'currentSaved': float(saved[i]),
+            'monthly_rate': float(rates[i]),
+            'sip': round(float(sips[i]), 2),
+            'stepUp': float(step_up[i]),
+            'final_balance': round(float(balances[i, n - 1]), 2),
+            'milestones': [
+                {
+                    'percent': level * 100,
+                    'month': int(milestones['month'][i, j]) if milestones['achieved'][i, j] else None,
+                    'balance': float(milestones['balance'][i, j]),
+                    'achieved': bool(milestones['achieved'][i, j]),
+                }
+                for j, level in enumerate(levels)
+            ],
+        }
+        if include_rows:
+            result['projection'] = [
+                {'month': m + 1, 'contributionThisMonth': float(c), 'balance': float(b)}
+                for m, (c, b) in enumerate(zip(contributions[i, :n], balances[i, :n]))
+            ]
+        results.append(result)
+    return results
+
+
+MAX_GRID_CELLS = 1_000_000
+
+
+def grid_axis_size(spec, default) -> int:
+    """Length of grid_axis(spec, default), checked without building the axis"""
+    if spec is None:
+        spec = default
+    if isinstance(spec, dict):
+        num = int(spec.get('num', 1))
+        if not 1 <= num <= MAX_GRID_CELLS:
+            raise ValueError(f"num must be between 1 and {MAX_GRID_CELLS}")
+        return num
+    if isinstance(spec, (int, float)):
+        return 1
+    return int(np.size(spec))
+
+
+def grid_axis(spec, default) -> np.ndarray:
+    """Axis values from a list or a {'start', 'stop', 'num'} range (inclusive)"""
+    if spec is None:
+        spec = default
+    if isinstance(spec, dict):
+        num = grid_axis_size(spec, default)
+        return np.linspace(float(spec['start']), float(spec['stop']), num)
+    if isinstance(spec, (int, float)):
+        return np.array([float(spec)])
+    return np.asarray(spec, dtype=float).reshape(-1)
+
+
+def grid_axes(*specs) -> List[np.ndarray]:
+    """
+    grid_axis for each (spec, default) pair. The product of the axis sizes
+    is checked against MAX_GRID_CELLS before any axis is allocated.
+    """
+    cells = 1
+    for spec, default in specs:
+        cells *= grid_axis_size(spec, default)
+    if cells > MAX_GRID_CELLS:
+        raise ValueError(f"grid larger than {MAX_GRID_CELLS} cells")
+    return [grid_axis(spec, default) for spec, default in specs]
+
+
+def sip_grid(goal_cost: float, annual_rates, years, step_ups,
+             current_saved: float = 0.0, inflation: float = 0.0) -> np.ndarray:
+    """
+    Required starting SIP for every (rate, years, step-up) combination.
+
+    One broadcasted call to required_sip over axes shaped (R,1,1), (1,Y,1)
+    and (1,1,S); rates and step-ups are annual fractions.
+    """
+    rates = np.asarray(annual_rates, dtype=float).reshape(-1, 1, 1)
+    months = 12 * np.asarray(years, dtype=float).reshape(1, -1, 1)
+    steps = np.asarray(step_ups, dtype=float).reshape(1, 1, -1)
+    if rates.size * months.size * steps.size > MAX_GRID_CELLS:
+        raise ValueError(f"grid larger than {MAX_GRID_CELLS} cells")
+    if (months <= 0).any():
+        raise ValueError("years must be greater than 0")
+    return required_sip(goal_cost, current_saved, months, rates / 12, steps, inflation)
+
+
+# Optional: benchmark block (the brute-force cross-check is in tests/test_goal_engine.py)
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(7)
+    n_goals = 10_000
+    targets = rng.uniform(1e5, 5e7, n_goals)
+    saved = rng.uniform(0, 5e5, n_goals)
+    months = rng.integers(1, 361, n_goals)
+    rates = rng.choice([0.0, 0.004, 0.008, 0.012], n_goals)
+    step_up = rng.choice([0.0, 0.05, 0.10, 0.15], n_goals)
+    inflation = rng.uniform(0, 0.08, n_goals)
+
+    start = time.perf_counter()
+    sips = required_sip(targets, saved, months, rates, step_up, inflation)
+    elapsed = time.perf_counter() - start
+    print(f"Closed-form solver: {n_goals} goals in {elapsed * 1000:.2f} ms")
+
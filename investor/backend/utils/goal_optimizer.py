@@ -0,0 +1,96 @@
+import numpy as np
+from typing import Dict, List
+
+from utils.goal_engine import monthly_rate_for, project_balances, required_sip
+
+
+def months_to_reach(targets, current_saved, sips, monthly_rates) -> np.ndarray:
+    """
+    Months needed to reach each target at a given SIP (closed form).
+
+    Solves saved * g^n + sip * (g^n - 1) / r = target for n; goals that can
+    never be reached (no SIP and no growth) come back as inf.
+    """
+    t = np.asarray(targets, dtype=float)
+    s = np.asarray(current_saved, dtype=float)
+    x = np.asarray(sips, dtype=float)
+    r = np.asarray(monthly_rates, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        safe_r = np.where(r > 0, r, 1.0)
+        growth_n = (t + x / safe_r) / (s + x / safe_r)
+        compound = np.log(growth_n) / np.log1p(safe_r)
+        linear = (t - s) / x
+        n = np.where(r > 0, compound, linear)
+    n = np.where(s >= t, 0, n)
+    n = np.where(np.isfinite(n) & (n >= 0), np.ceil(n - 1e-9), np.inf)
+    return n
+
+
+def optimize_goals(goals: List[Dict], monthly_savings: float) -> Dict:
+    """
+    Split one monthly savings budget across several goals by priority.
+
+    Each goal gets a flat SIP over its own horizon, so the schedule is a
+    (goals x months) cash-flow matrix whose column sums must stay within the
+    budget. Funding goals in priority order, each up to its required SIP and
+    the slack left in its busiest month, is the exact solution of the
+    lexicographic LP max x_1, then x_2, ... s.t. C.sum(axis=0) <= budget.
+    """
+    if monthly_savings < 0:
+        raise ValueError("monthly_savings must not be negative")
+    if not goals:
+        return {'monthly_savings': monthly_savings, 'feasible': True, 'goals': [], 'cash_flow': []}
+
+    targets = np.array([float(g.get('target', 0)) for g in goals])
+    months = np.array([max(1, int(g.get('months', 1))) for g in goals])
+    saved = np.array([float(g.get('currentSaved', 0) or 0) for g in goals])
+    rates = np.array([monthly_rate_for(g) for g in goals])
+    if (targets <= 0).any():
+        raise ValueError("target must be greater than 0")
+
+    # Lower priority value is funded first; ties keep the given order
+    priorities = np.array([float(g.get('priority', i + 1)) for i, g in enumerate(goals)])
+    order = np.argsort(priorities, kind='stable')
+
+    needed = required_sip(targets, saved, months, rates)
+    horizon = int(months.max())
+    active = np.arange(horizon) < months.reshape(-1, 1)
+
+    allocated = np.zeros(horizon)
+    sips = np.zeros(len(goals))
+    for i in order:
+        slack = monthly_savings - allocated[active[i]].max()
+        sips[i] = min(needed[i], max(0.0, slack))
+        allocated += sips[i] * active[i]
+
+    cash_flow = sips.reshape(-1, 1) * active
+    # End-of-month payments, the convention required_sip and months_to_reach solve
+    balances = project_balances(sips, saved, months, rates, payments_at_end=True)
+    final = balances[np.arange(len(goals)), months - 1]
+    eta = months_to_reach(targets, saved, sips, rates)
+
+    funded = np.where(needed > 0, sips / np.where(needed > 0, needed, 1), 1.0)
+    results = []
+    for i, goal in enumerate(goals):
+        results.append({
+            'name': goal.get('name'),
+            'priority': float(priorities[i]),
+            'target': float(targets[i]),
+            'months': int(months[i]),
+            'required_sip': round(float(needed[i]), 2),
+            'allocated_sip': round(float(sips[i]), 2),
+            'funded_ratio': round(float(min(funded[i], 1.0)), 4),
+            'shortfall_sip': round(float(max(needed[i] - sips[i], 0)), 2),
+            'projected_value': round(float(final[i]), 2),
+            'months_to_target': int(eta[i]) if np.isfinite(eta[i]) else None,
+        })
+
+    return {
+        'monthly_savings': monthly_savings,
+        'feasible': bool(np.all(sips >= needed - 1e-6)),
+        'total_required_sip': round(float(needed.sum()), 2),
+        'peak_allocation': round(float(allocated.max()), 2),
+        'goals': results,
+        'cash_flow': np.round(cash_flow.sum(axis=0), 2).tolist(),
+    }
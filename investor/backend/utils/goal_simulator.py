@@ -0,0 +1,132 @@
+import os
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from utils.goal_engine import inflate, sip_schedule
+from utils.process_pool import SharedProcessPool
+
+DEFAULT_ANNUAL_RETURN = 0.12  # same assumption as /goal-plan
+ANNUAL_VOLATILITY_BY_RISK = {
+    'Low': 0.06,
+    'Medium': 0.15,
+    'High': 0.22,
+}
+PERCENTILES = (5, 25, 50, 75, 95)
+MAX_PATHS = 200_000
+MAX_MONTHS = 600  # 50 years
+SIM_WORKERS = int(os.environ.get('GOAL_SIM_WORKERS', 0))
+
+# Chunks of every request share these processes (in-process with 0 or 1 worker)
+_pool = SharedProcessPool(min(SIM_WORKERS, os.cpu_count() or 1), name="Goal simulation")
+
+
+def _simulate_chunk(args) -> Dict:
+    """
+    Simulate one chunk of return paths.
+
+    The final balance is linear in the SIP: B_T = saved * G_T + sip * A_T,
+    with G the cumulative growth and A_T = G_T * sum(w_k/G_k), where w
+    holds the step-up multiplier of each month's payment (paid at the end
+    of the month, as in `required_sip`). Keeping
+    G_T and A_T per path lets the caller evaluate any SIP without
+    re-simulating; balances are only kept at the checkpoint months.
+    """
+    seed_seq, n_paths, months, monthly_mu, monthly_sigma, saved, sip, weights, checkpoints = args
+    rng = np.random.default_rng(seed_seq)
+
+    log_returns = rng.normal(monthly_mu, monthly_sigma, size=(n_paths, months))
+    growth = np.exp(np.cumsum(log_returns, axis=1))
+
+    annuity = growth * np.cumsum(weights / growth, axis=1)
+
+    return {
+        'growth_T': growth[:, -1],
+        'annuity_T': annuity[:, -1],
+        'checkpoints': saved * growth[:, checkpoints] + sip * annuity[:, checkpoints],
+    }
+
+
+def _chunk_sizes(n_paths: int, chunk_size: int) -> List[int]:
+    full, rest = divmod(n_paths, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def simulate_goal(target: float, months: int, sip: float, current_saved: float = 0.0,
+                  monthly_rate: float = DEFAULT_ANNUAL_RETURN / 12, annual_volatility: float = 0.15,
+                  step_up: float = 0.0, inflation: float = 0.0,
+                  n_paths: int = 20000, chunk_size: int = 5000, seed: int = 42,
+                  confidence: float = 0.9,
+                  percentiles: Sequence[float] = PERCENTILES) -> Dict:
+    """
+    Monte Carlo success probability for a SIP goal.
+
+    Monthly log-returns are i.i.d. normal, calibrated so the expected
+    monthly growth is 1 + `monthly_rate`, the rate `required_sip` compounds
+    at; SIPs are paid at the end of each month, so with no volatility every
+    path ends on the deterministic `project_balances(..., payments_at_end=True)`
+    value. `step_up` raises the SIP every 12 months and `inflation` grows the
+    target, as in the closed-form solver. Paths
+    are generated in chunks of (chunk_size x months) to bound memory; each
+    chunk gets its own child of one SeedSequence, so results are identical
+    whether the chunks run in-process or in the shared pool
+    (GOAL_SIM_WORKERS processes).
+    """
+    if target <= 0 or months <= 0:
+        raise ValueError("target and months must be greater than 0")
+    if months > MAX_MONTHS:
+        raise ValueError(f"months must be at most {MAX_MONTHS}")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+
+    months = int(months)
+    target = float(inflate(target, inflation, months))
+    n_paths = int(min(max(n_paths, 1), MAX_PATHS))
+    chunk_size = int(max(1, min(chunk_size, n_paths)))
+
+    monthly_sigma = annual_volatility / np.sqrt(12)
+    monthly_mu = np.log1p(monthly_rate) - 0.5 * monthly_sigma ** 2
+
+    weights = sip_schedule(1.0, step_up, [months])[0]
+    checkpoints = np.unique(np.append(np.arange(11, months, 12), months - 1))
+    sizes = _chunk_sizes(n_paths, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (s, size, months, monthly_mu, monthly_sigma, float(current_saved), float(sip), weights, checkpoints)
+        for s, size in zip(seeds, sizes)
+    ]
+
+    chunks = _pool.map(_simulate_chunk, tasks)
+
+    growth_T = np.concatenate([c['growth_T'] for c in chunks])
+    annuity_T = np.concatenate([c['annuity_T'] for c in chunks])
+    balances = np.concatenate([c['checkpoints'] for c in chunks])
+
+    final = current_saved * growth_T + sip * annuity_T
+    # SIP each path would have needed; its quantile is the SIP for a given confidence
+    needed = np.maximum(0, (target - current_saved * growth_T) / annuity_T)
+    bands = np.percentile(balances, percentiles, axis=0)
+
+    return {
+        'paths': n_paths,
+        'seed': seed,
+        'sip': round(float(sip), 2),
+        'target': round(target, 2),
+        'success_probability': round(float(np.mean(final >= target)), 4),
+        'median_final_balance': round(float(np.median(final)), 2),
+        'confidence': confidence,
+        'sip_for_confidence': round(float(np.quantile(needed, confidence)), 2),
+        'percentile_bands': {
+            'months': (checkpoints + 1).tolist(),
+            **{f'p{int(p)}': np.round(bands[i], 2).tolist() for i, p in enumerate(percentiles)},
+        },
+        'assumptions': {
+            'monthly_rate': monthly_rate,
+            'annual_volatility': annual_volatility,
+            'step_up': step_up,
+            'inflation': inflation,
+        },
+    }
+
+
+def volatility_for(risk: Optional[str]) -> float:
+    return ANNUAL_VOLATILITY_BY_RISK.get(risk or 'Medium', ANNUAL_VOLATILITY_BY_RISK['Medium'])
@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.market_provider import (
+    COLUMNS, PERIOD_DAYS, MarketDataProvider, fixture_name, market_provider, period_days,
+)
+from utils.rate_limiter import UpstreamThrottled, upstream_limiter
+
+BASE = Path(__file__).resolve().parents[1]
+HISTORY_DIR = Path(os.environ.get('MARKET_HISTORY_DIR') or BASE / "data" / "history")
+
+EARLIEST = -(10 ** 9)  # coverage marker for period='max'
+
+
+class HistoryStore:
+    """
+    Local per-symbol daily OHLCV store.
+
+    Each symbol is a directory of append-only raw column files (dates as
+    int64 days since epoch, prices/volume as float64) plus a small meta.json
+    holding the committed row count. New bars are appended to every column
+    before the row count is bumped, so a reader never sees a torn append.
+    Reads memory-map the columns and slice by date with searchsorted, and
+    upstream is only asked for bars after the last stored session. Today's
+    still-forming bar is kept in memory and never written to disk.
+    """
+
+    def __init__(self, root: Path = HISTORY_DIR, provider: MarketDataProvider = market_provider,
+                 fetcher: Optional[Callable] = None, initial_period: str = "2y",
+                 recheck_seconds: float = 900):
+        self.root = Path(root)
+        self.provider = provider
+        self.fetcher = fetcher
+        self.initial_period = initial_period
+        self.recheck_seconds = recheck_seconds
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._live_bars: Dict[str, pd.DataFrame] = {}
+        self._checked_at: Dict[str, float] = {}
+
+    # ---- Files ----
+    def _dir(self, symbol: str) -> Path:
+        return self.root / fixture_name(symbol)
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def _meta(self, symbol: str) -> Dict:
+        try:
+            with open(self._dir(symbol) / "meta.json", "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'rows': 0}
+
+    def _write_meta(self, symbol: str, meta: Dict):
+        path = self._dir(symbol) / "meta.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, path)
+
+    def _column(self, symbol: str, name: str, rows: int) -> np.ndarray:
+        dtype = np.int64 if name == 'date' else np.float64
+        path = self._dir(symbol) / f"{name}.bin"
+        if rows == 0 or not path.exists():
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    # ---- Normalisation ----
+    @staticmethod
+    def _to_days(index) -> np.ndarray:
+        idx = pd.DatetimeIndex(index)
+        if idx.tz is not None:
+            idx = idx.tz_localize(None)
+        return idx.normalize().values.astype('datetime64[D]').astype(np.int64)
+
+    @staticmethod
+    def _today() -> int:
+        return int(np.datetime64(datetime.now().date(), 'D').astype(np.int64))
+
+    # ---- Writes ----
+    def _append(self, symbol: str, bars: pd.DataFrame, meta: Dict, truncate: bool = False):
+        """Append completed bars newer than the last stored date"""
+        directory = self._dir(symbol)
+        directory.mkdir(parents=True, exist_ok=True)
+        rows = 0 if truncate else int(meta.get('rows', 0))
+        last_day = meta.get('last_day') if not truncate else None
+
+        days = self._to_days(bars.index)
+        keep = days < self._today()
+        if last_day is not None:
+            keep &= days > last_day
+        if not keep.any():
+            return meta
+
+        days = days[keep]
+        values = {c: bars[c].to_numpy(dtype=np.float64)[keep] for c in COLUMNS}
+        mode = "wb" if truncate else "r+b"
+        for name, arr in [('date', days)] + list(values.items()):
+            path = directory / f"{name}.bin"
+            if mode == "r+b" and not path.exists():
+                path.touch()
+            with open(path, mode) as fh:
+                # Overwrite anything past the committed rows (a torn earlier append)
+                fh.seek(rows * arr.itemsize)
+                fh.write(np.ascontiguousarray(arr).tobytes())
+                fh.truncate()
+
+        meta = {
+            'rows': rows + len(days),
+            'first_day': int(days[0]) if rows == 0 else meta['first_day'],
+            'last_day': int(days[-1]),
+            'coverage_start': meta.get('coverage_start', int(days[0])),
+            'updated_at': datetime.now().isoformat(),
+        }
+        self._write_meta(symbol, meta)
+        return meta
+
+    def _fetch(self, symbol: str, timeout: Optional[float], **kwargs) -> pd.DataFrame:
+        if self.fetcher is not None:
+            return self.fetcher(symbol, timeout=timeout, **kwargs)
+        return upstream_limiter.call(self.provider.history, symbol, timeout=timeout, **kwargs)
+
+    def _fill_period(self, needed_days: Optional[int]) -> str:
+        """Smallest yfinance period covering both the request and `initial_period`"""
+        if needed_days is None:
+            return 'max'
+        needed_days = max(needed_days, period_days(self.initial_period) or 0)
+        return next((p for p, d in PERIOD_DAYS.items() if d >= needed_days), 'max')
+
+    def _refresh(self, symbol: str, needed_days: Optional[int], timeout: Optional[float]) -> Dict:
+        meta = self._meta(symbol)
+        today = self._today()
+        key = symbol.upper()
+        recently_checked = time.time() - self._checked_at.get(key, 0) < self.recheck_seconds
+
+        want_start = EARLIEST if needed_days is None else today - needed_days
+        if int(meta.get('rows', 0)) == 0 or meta.get('coverage_start', today) > want_start:
+            # First fill, or the request reaches further back than the store
+            if recently_checked and meta.get('rows'):
+                return meta
+            period = self._fill_period(needed_days)
+            bars = self._fetch(symbol, timeout, period=period)
+            self._checked_at[key] = time.time()
+            if bars is None or bars.empty:
+                return meta
+            coverage = EARLIEST if period == 'max' else today - period_days(period)
+            meta = self._append(symbol, bars, {'coverage_start': coverage}, truncate=True)
+            self._remember_live_bar(symbol, bars)
+            return meta
+
+        if recently_checked:
+            return meta
+
+        # Once yesterday is stored this asks for today only, which refreshes the
+        # live bar every `recheck_seconds` instead of freezing it at the first fetch
+        start = str(np.datetime64(meta['last_day'] + 1, 'D'))
+        bars = self._fetch(symbol, timeout, start=start)
+        self._checked_at[key] = time.time()
+        if bars is not None and not bars.empty:
+            meta = self._append(symbol, bars, meta)
+            self._remember_live_bar(symbol, bars)
+        return meta
+
+    def _remember_live_bar(self, symbol: str, bars: pd.DataFrame):
+        days = self._to_days(bars.index)
+        today = bars[days >= self._today()]
+        if not today.empty:
+            live = today[COLUMNS].copy()
+            live.index = pd.to_datetime(self._to_days(live.index).astype('datetime64[D]'))
+            self._live_bars[symbol.upper()] = live
+
+    # ---- Reads ----
+    def read(self, symbol: str, period: str = "2y", include_live: bool = True) -> pd.DataFrame:
+        """Stored bars for `period` without touching upstream"""
+        meta = self._meta(symbol)
+        rows = int(meta.get('rows', 0))
+        dates = self._column(symbol, 'date', rows)
+        needed = period_days(period)
+
+        start = 0
+        if needed is not None and rows:
+            start = int(np.searchsorted(dates, self._today() - needed, side='left'))
+        frame = pd.DataFrame(
+            {c: np.asarray(self._column(symbol, c, rows)[start:]) for c in COLUMNS},
+            index=pd.DatetimeIndex(np.asarray(dates[start:]).astype('datetime64[D]'), name='Date'),
+        )
+
+        live = self._live_bars.get(symbol.upper()) if include_live else None
+        if live is not None and self._to_days(live.index)[0] < self._today():
+            live = None  # yesterday's partial bar; the completed one comes from upstream
+        if live is not None and (frame.empty or live.index[0] > frame.index[-1]):
+            frame = pd.concat([frame, live])
+        return frame
+
+    def get_history(self, symbol: str, period: str = "2y", timeout: Optional[float] = None) -> pd.DataFrame:
+        """
+        Bars for `period`, fetching only the sessions missing since the last
+        stored date. `timeout` bounds the wait for an upstream slot; when
+        upstream is throttled or down the stored bars are served as they are.
+        """
+        with self._lock(symbol):
+            try:
+                self._refresh(symbol, period_days(period), timeout)
+            except UpstreamThrottled:
+                print(f"[WARN] History refresh throttled for {symbol}, serving stored bars")
+            except Exception as e:
+                print(f"[WARN] History refresh failed for {symbol}, serving stored bars: {e}")
+        return self.read(symbol, period)
+
+    def stats(self) -> Dict:
+        symbols = [d for d in self.root.iterdir() if d.is_dir()] if self.root.exists() else []
+        rows = sum(int(self._meta(d.name).get('rows', 0)) for d in symbols)
+        return {'symbols': len(symbols), 'rows': rows, 'root': str(self.root)}
+
+
+# Global instance
+history_store = HistoryStore()
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+
+# Vectorized indicators for a whole universe in one pass. Every function takes
+# 2-D float arrays shaped (symbols, time), oldest bar first, and returns the
+# same shape. Shorter histories are NaN-padded on the left (see stack_bars);
+# positions without enough history are NaN, as in the per-symbol pandas
+# versions in MarketFrame. Windowed statistics use cumulative sums and EMAs a
+# recursive filter stepped over time, so the cost is a few array passes
+# however many symbols are in the batch.
+
+
+def _as_2d(x) -> np.ndarray:
+    arr = np.asarray(x, dtype=np.float64)
+    return arr.reshape(1, -1) if arr.ndim == 1 else arr
+
+
+def _window_sums(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Trailing-window sums of the valid values and how many values were valid"""
+    valid = ~np.isnan(x)
+    zero = np.zeros((x.shape[0], 1))
+    csum = np.concatenate([zero, np.cumsum(np.where(valid, x, 0.0), axis=1)], axis=1)
+    ccount = np.concatenate([zero, np.cumsum(valid, axis=1)], axis=1)
+    sums = np.full(x.shape, np.nan)
+    counts = np.zeros(x.shape)
+    if x.shape[1] >= window:
+        sums[:, window - 1:] = csum[:, window:] - csum[:, :-window]
+        counts[:, window - 1:] = ccount[:, window:] - ccount[:, :-window]
+    return sums, counts
+
+
+def sma(x, window: int) -> np.ndarray:
+    """Simple moving average (NaN until `window` bars are available)"""
+    x = _as_2d(x)
+    sums, counts = _window_sums(x, window)
+    with np.errstate(invalid='ignore'):
+        return np.where(counts == window, sums / window, np.nan)
+
+
+def rolling_std(x, window: int, ddof: int = 1) -> np.ndarray:
+    """Rolling sample standard deviation via sums of values and squares"""
+    x = _as_2d(x)
+    # Shift each row by a typical value first: the variance is unchanged and
+    # the squared sums stay small enough not to lose precision
+    with np.errstate(invalid='ignore'):
+        centred = x - np.nanmean(x, axis=1, keepdims=True)
+    sums, counts = _window_sums(centred, window)
+    squares, _ = _window_sums(centred * centred, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (squares - sums * sums / window) / (window - ddof)
+    var = np.where(counts == window, np.maximum(var, 0.0), np.nan)
+    return np.sqrt(var)
+
+
+def _decay_filter(x: np.ndarray, decay: float, block: int = 64) -> np.ndarray:
+    """
+    y[t] = decay * y[t-1] + x[t] along the time axis. Inside a block of
+    `block` steps the recursion has the closed form
+    y[t0+j] = decay^(j+1) * y[t0-1] + decay^j * cumsum(x[t0+k] * decay^-k),
+    so the Python loop runs once per block instead of once per bar; the
+    block length keeps decay^-k far from overflow.
+    """
+    out = np.empty_like(x)
+    carry = np.zeros(x.shape[0])
+    powers = decay ** np.arange(block + 1)
+    for t0 in range(0, x.shape[1], block):
+        chunk = x[:, t0:t0 + block]
+        n = chunk.shape[1]
+        scaled = np.cumsum(chunk / powers[:n], axis=1)
+        out[:, t0:t0 + n] = scaled * powers[:n] + carry[:, None] * powers[1:n + 1]
+        carry = out[:, t0 + n - 1]
+    return out
+
+
+def ema(x, span: int) -> np.ndarray:
+    """
+    Adjusted exponentially weighted mean, as pandas `ewm(span=span).mean()`:
+    a decaying sum of the values over a decaying sum of the weights, each a
+    first-order recursive filter. A row's filter starts at its first valid bar.
+    """
+    x = _as_2d(x)
+    decay = 1.0 - 2.0 / (span + 1.0)
+    valid = ~np.isnan(x)
+    num = _decay_filter(np.where(valid, x, 0.0), decay)
+    den = _decay_filter(valid.astype(np.float64), decay)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / den, np.nan)
+
+
+def pct_change(x, periods: int = 1) -> np.ndarray:
+    x = _as_2d(x)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] > periods:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, periods:] = x[:, periods:] / x[:, :-periods] - 1
+    return out
+
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """Relative strength index over simple moving averages of gains and losses"""
+    close = _as_2d(close)
+    delta = np.full(close.shape, np.nan)
+    delta[:, 1:] = np.diff(close, axis=1)
+    # A row's first bar has no change; it counts as 0, as in the pandas version
+    valid = ~np.isnan(close)
+    gain = np.where(valid, np.where(delta > 0, delta, 0.0), np.nan)
+    loss = np.where(valid, np.where(delta < 0, -delta, 0.0), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 - (100 / (1 + sma(gain, period) / sma(loss, period)))
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray]:
+    """MACD line and its signal line"""
+    close = _as_2d(close)
+    line = ema(close, fast) - ema(close, slow)
+    return line, ema(line, signal)
+
+
+def volume_ratio(volume, window: int = 20) -> np.ndarray:
+    volume = _as_2d(volume)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return volume / sma(volume, window)
+
+
+def feature_arrays(close, volume) -> Dict[str, np.ndarray]:
+    """The predictor's feature columns (see market_frame.FEATURE_COLUMNS) for every symbol"""
+    close, volume = _as_2d(close), _as_2d(volume)
+    line, signal = macd(close)
+    return {
+        'SMA_5': sma(close, 5),
+        'SMA_20': sma(close, 20),
+        'SMA_50': sma(close, 50),
+        'Volatility': rolling_std(close, 20),
+        'RSI': rsi(close, 14),
+        'MACD': line,
+        'MACD_Signal': signal,
+        'Price_Change_1d': pct_change(close, 1),
+        'Price_Change_5d': pct_change(close, 5),
+        'Price_Change_20d': pct_change(close, 20),
+        'Volume_Ratio': volume_ratio(volume, 20),
+    }
+
+
+def stack_bars(frames: Dict[str, pd.DataFrame], column: str, length: int = None) -> Tuple[List[str], np.ndarray]:
+    """
+    (symbols, array) with each symbol's last `length` values of `column`
+    right-aligned, so every row is that symbol's own bar sequence and
+    shorter histories are NaN-padded on the left.
+    """
+    symbols = [s for s, df in frames.items() if df is not None and not df.empty]
+    length = length or max((len(frames[s]) for s in symbols), default=0)
+    out = np.full((len(symbols), length), np.nan)
+    for row, symbol in enumerate(symbols):
+        values = frames[symbol][column].to_numpy(dtype=np.float64)[-length:]
+        out[row, length - len(values):] = values
+    return symbols, out
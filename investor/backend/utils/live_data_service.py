@@ -1,80 +1,156 @@
-import yfinance as yf
-import pandas as pd
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import pandas as pd
+from collections import Counter
 from datetime import datetime
 from typing import Dict, List, Optional
-from yahoo_fin import stock_info as si
+
+from utils import indicators
+from utils.market_cache import MarketCache
+from utils.market_frame import MarketFrame, market_frames
+from utils.market_provider import MarketDataProvider, market_provider
+from utils.rate_limiter import UpstreamThrottled, upstream_limiter
+from utils.single_flight import SingleFlight
 
 
 class LiveDataService:
     """Optimized service for fetching live financial data with caching and rate-limit handling"""
 
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, provider: Optional[MarketDataProvider] = None):
+        self.provider = provider or market_provider
         self.cache_duration = 300  # 5 minutes
+        self.cache = MarketCache(
+            max_entries=int(os.environ.get('MARKET_CACHE_MAX_ENTRIES', 5000)),
+            max_bytes=int(os.environ.get('MARKET_CACHE_MAX_MB', 256)) * 1024 * 1024,
+            ttls={'quote': self.cache_duration},
+            disk_dir=os.environ.get('MARKET_CACHE_DIR') or None,
+        )
         self.popular_stocks = [
             'AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX',
             'AMD', 'INTC', 'CRM', 'ADBE', 'PYPL', 'UBER', 'SPOT'
         ]
         self.major_indices = ['^GSPC', '^DJI', '^IXIC', '^VIX']
-        self.last_request_time = {}
-        self.request_gap = 2  # seconds per symbol to avoid rate limit
+        self.limiter = upstream_limiter
+        self.upstream_timeout = float(os.environ.get('MARKET_UPSTREAM_TIMEOUT', 2.0))
+        self._access_counts = Counter()
+        self._access_lock = threading.Lock()
+        # Concurrent misses share one fetch; recently expired quotes are served while revalidating
+        self.swr_max_stale = float(os.environ.get('MARKET_SWR_MAX_STALE', 900))
+        self._flights = SingleFlight()
+        self._revalidator = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('MARKET_REVALIDATE_WORKERS', 4)),
+            thread_name_prefix="market-revalidate",
+        )
+        # Overview / trending fan out over small bulk batches under one overall deadline
+        self.fanout_deadline = float(os.environ.get('MARKET_FANOUT_DEADLINE', 3.0))
+        self.fanout_chunk = int(os.environ.get('MARKET_FANOUT_CHUNK', 5))
+        self._fanout = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('MARKET_FANOUT_WORKERS', 8)),
+            thread_name_prefix="market-fanout",
+        )
+        self._fetch_latency: Dict[str, float] = {}
 
     # ---- Cache Helpers ----
     def _cache_get(self, key: str) -> Optional[dict]:
-        current_time = time.time()
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if current_time - timestamp < self.cache_duration:
-                return data
-        return None
-
-    def _cache_set(self, key: str, data: dict):
-        self.cache[key] = (data, time.time())
+        return self.cache.get(key)
+
+    def _cache_set(self, key: str, data, kind: str = 'quote'):
+        self.cache.set(key, data, kind=kind)
+
+    def _cache_stale(self, key: str, max_stale: Optional[float] = None):
+        """Expired-but-recent value to serve when upstream is throttled or while revalidating"""
+        stale = self.cache.get_stale(key, max_stale)
+        if isinstance(stale, dict):
+            return {**stale, 'stale': True}
+        return stale
+
+    def cache_stats(self) -> Dict:
+        return self.cache.stats()
+
+    def cached_name(self, symbol: str) -> str:
+        """Display name from cached info or quotes only (never calls upstream)"""
+        for key, field in ((f"{symbol}_info", 'longName'), (f"{symbol}_1d", 'name')):
+            data = self.cache.get(key) or self.cache.get_stale(key)
+            if isinstance(data, dict) and data.get(field):
+                return data[field]
+        return symbol
+
+    def _revalidate(self, key: str, fn, *args):
+        """Refresh `key` in the background unless a fetch for it is already running"""
+        self._flights.do_async(key, self._revalidator, fn, *args)
+
+    def coalescing_stats(self) -> Dict:
+        return {**self._flights.stats(), 'swr_max_stale': self.swr_max_stale}
+
+    # ---- Traffic tracking (feeds the prefetch scheduler) ----
+    def _record_access(self, symbols: List[str]):
+        with self._access_lock:
+            self._access_counts.update(symbols)
+
+    def hot_symbols(self, limit: int = 20) -> List[str]:
+        with self._access_lock:
+            return [sym for sym, _ in self._access_counts.most_common(limit)]
+
+    def decay_access_counts(self, factor: float = 0.5):
+        """Age out old traffic so 'hot' reflects recent requests"""
+        with self._access_lock:
+            self._access_counts = Counter({
+                sym: count * factor for sym, count in self._access_counts.items()
+                if count * factor >= 1
+            })
 
     # ---- Throttling ----
-    def _throttle(self, symbol: str):
-        now = time.time()
-        if symbol in self.last_request_time:
-            elapsed = now - self.last_request_time[symbol]
-            if elapsed < self.request_gap:
-                time.sleep(self.request_gap - elapsed)
-        self.last_request_time[symbol] = time.time()
-
-    # ---- Safe Ticker ----
-    def _safe_yf_ticker(self, symbol: str) -> Optional[yf.Ticker]:
-        for attempt in range(5):
-            try:
-                self._throttle(symbol)
-                return yf.Ticker(symbol)
-            except Exception as e:
-                if "429" in str(e):
-                    wait = 2 ** attempt
-                    print(f"[429] Rate limited for {symbol}. Retrying in {wait}s...")
-                    time.sleep(wait)
-                else:
-                    print(f"[ERROR] Ticker init failed for {symbol}: {e}")
-                    return None
-        return None
+    def _upstream(self, fn, *args, **kwargs):
+        """Every Yahoo call goes through the process-wide token bucket"""
+        return self.limiter.call(fn, *args, timeout=self.upstream_timeout, **kwargs)
+
+    def limiter_stats(self) -> Dict:
+        return self.limiter.stats()
+
+    def _get_info(self, symbol: str) -> Dict:
+        """Company profile changes rarely, so it is cached with the long 'info' TTL"""
+        key = f"{symbol}_info"
+        info = self._cache_get(key)
+        if info is None:
+            info = self._flights.do(key, self._fetch_info, symbol)
+        return info
+
+    def _fetch_info(self, symbol: str) -> Dict:
+        info = self._upstream(self.provider.info, symbol) or {}
+        self._cache_set(f"{symbol}_info", info, kind='info')
+        return info
 
     # ---- Live Stock Data ----
     def get_live_stock_data(self, symbol: str, period: str = "1d") -> Optional[Dict]:
+        """
+        Quote for `symbol`. A quote that expired less than `swr_max_stale`
+        seconds ago is served (flagged stale) while a single background
+        refresh renews it; concurrent misses wait on one shared fetch.
+        """
+        self._record_access([symbol])
         cache_key = f"{symbol}_{period}"
         cached = self._cache_get(cache_key)
         if cached:
             return cached
 
-        ticker = self._safe_yf_ticker(symbol)
-        if not ticker:
-            return None
+        stale = self._cache_stale(cache_key, self.swr_max_stale)
+        if stale:
+            self._revalidate(cache_key, self._fetch_quote, symbol, period)
+            return stale
 
+        return self._flights.do(cache_key, self._fetch_quote, symbol, period)
+
+    def _fetch_quote(self, symbol: str, period: str = "1d") -> Optional[Dict]:
+        cache_key = f"{symbol}_{period}"
         try:
-            info = ticker.info
-            hist = ticker.history(period=period)
+            info = self._get_info(symbol)
+            hist = self._upstream(self.provider.history, symbol, period=period)
             if hist.empty:
-                print(f"[WARN] No data from yfinance for {symbol}, trying yahoo_fin fallback...")
+                print(f"[WARN] No history for {symbol}, trying live price fallback...")
                 try:
-                    price = float(si.get_live_price(symbol))
+                    price = float(self._upstream(self.provider.live_price, symbol))
                     data = {
                         'symbol': symbol.upper(),
                         'name': info.get('longName', symbol),
@@ -96,104 +172,308 @@ class LiveDataService:
                     }
                     self._cache_set(cache_key, data)
                     return data
+                except UpstreamThrottled:
+                    raise
                 except Exception as e:
-                    print(f"[FALLBACK ERROR] Yahoo_fin also failed for {symbol}: {e}")
+                    print(f"[FALLBACK ERROR] Live price also failed for {symbol}: {e}")
                     return None
 
             latest = hist.iloc[-1]
-            current_price = float(latest['Close'])
-            prev_close = float(info.get('previousClose', current_price))
-            change = current_price - prev_close
-            change_pct = (change / prev_close * 100) if prev_close > 0 else 0
-            market_state = info.get('marketState', 'UNKNOWN')
-            is_market_open = market_state == 'REGULAR'
-
-            data = {
-                'symbol': symbol.upper(),
-                'name': info.get('longName', symbol),
-                'current_price': current_price,
-                'previous_close': prev_close,
-                'change': change,
-                'change_percent': change_pct,
-                'volume': int(latest['Volume']),
-                'high': float(latest['High']),
-                'low': float(latest['Low']),
-                'open': float(latest['Open']),
-                'market_cap': info.get('marketCap', 0),
-                'pe_ratio': info.get('trailingPE', 0),
-                'dividend_yield': info.get('dividendYield', 0),
-                'market_state': market_state,
-                'is_market_open': is_market_open,
-                'last_updated': datetime.now().isoformat(),
-                'currency': info.get('currency', 'USD')
-            }
+            prev_close = float(info.get('previousClose', latest['Close']))
+            data = self._build_quote(symbol, latest, prev_close, info)
 
             self._cache_set(cache_key, data)
             return data
 
+        except UpstreamThrottled:
+            print(f"[THROTTLED] Serving cached data for {symbol}")
+            return self._cache_get(cache_key) or self._cache_stale(cache_key)
         except Exception as e:
             print(f"[ERROR] Fetching {symbol} failed: {e}")
             return None
 
+    def _build_quote(self, symbol: str, latest: pd.Series, prev_close: float, info: Dict) -> Dict:
+        """Quote payload from the latest OHLCV bar plus whatever `info` fields are known"""
+        current_price = float(latest['Close'])
+        change = current_price - prev_close
+        change_pct = (change / prev_close * 100) if prev_close > 0 else 0
+        market_state = info.get('marketState', 'UNKNOWN')
+        is_market_open = market_state == 'REGULAR'
+
+        return {
+            'symbol': symbol.upper(),
+            'name': info.get('longName', symbol),
+            'current_price': current_price,
+            'previous_close': prev_close,
+            'change': change,
+            'change_percent': change_pct,
+            'volume': int(latest['Volume']),
+            'high': float(latest['High']),
+            'low': float(latest['Low']),
+            'open': float(latest['Open']),
+            'market_cap': info.get('marketCap', 0),
+            'pe_ratio': info.get('trailingPE', 0),
+            'dividend_yield': info.get('dividendYield', 0),
+            'market_state': market_state,
+            'is_market_open': is_market_open,
+            'last_updated': datetime.now().isoformat(),
+            'currency': info.get('currency', 'USD')
+        }
+
     # ---- Multiple Stocks ----
-    def get_multiple_stocks_data(self, symbols: List[str]) -> Dict[str, Dict]:
+    def _download_history(self, symbols: List[str], period: str = "5d") -> Optional[Dict[str, pd.DataFrame]]:
+        """OHLCV for many symbols in one multi-ticker request (None when throttled)"""
+        try:
+            histories = self._upstream(self.provider.download, symbols, period=period)
+        except UpstreamThrottled:
+            print(f"[THROTTLED] Bulk download skipped for {len(symbols)} symbols")
+            return None
+        except Exception as e:
+            print(f"[ERROR] Bulk download failed for {len(symbols)} symbols: {e}")
+            return {}
+        return histories or {}
+
+    def get_multiple_stocks_data(self, symbols: List[str], with_info: bool = False,
+                                 refresh: bool = False) -> Dict[str, Dict]:
+        """
+        Quotes for many symbols; cache misses are filled by a single bulk download.
+
+        Previous close comes from the prior bar, so company info is only
+        fetched when `with_info` asks for fundamentals that aren't cached yet.
+        Recently expired quotes are served stale and renewed in the
+        background. `refresh` skips the cache read so the prefetcher can renew
+        entries before they expire.
+        """
         results = {}
         symbols_to_fetch = []
+        to_revalidate = []
 
         # Use cache first
         for symbol in symbols:
-            cached = self._cache_get(f"{symbol}_1d")
+            key = f"{symbol}_1d"
+            cached = None if refresh else self._cache_get(key)
             if cached:
                 results[symbol] = cached
+                continue
+            stale = None if refresh else self._cache_stale(key, self.swr_max_stale)
+            if stale:
+                results[symbol] = stale
+                to_revalidate.append(symbol)
             else:
                 symbols_to_fetch.append(symbol)
 
-        if not symbols_to_fetch:
+        if to_revalidate:
+            self._revalidate(self._bulk_key(to_revalidate, with_info), self._fetch_quotes, to_revalidate, with_info)
+        if symbols_to_fetch:
+            # Identical batches (overview, trending) from concurrent requests share one download
+            fetched = self._flights.do(self._bulk_key(symbols_to_fetch, with_info), self._fetch_quotes,
+                                       symbols_to_fetch, with_info)
+            results.update(fetched)
+
+        return {sym: results[sym] for sym in symbols if sym in results}
+
+    @staticmethod
+    def _bulk_key(symbols: List[str], with_info: bool = False) -> str:
+        return "bulk:" + ",".join(sorted(symbols)) + (":info" if with_info else "")
+
+    def _fetch_quotes(self, symbols: List[str], with_info: bool = False) -> Dict[str, Dict]:
+        """
+        Bulk-download `symbols` and cache a quote for each. Name, market cap,
+        market state and the other profile fields come from cached info; with
+        `with_info` a missing profile is fetched (through the rate limiter)
+        and cached for a day.
+        """
+        results = {}
+        histories = self._download_history(symbols)
+        if histories is None:
+            # No upstream slot: serve whatever recent data the cache still has
+            for sym in symbols:
+                cached = self._cache_get(f"{sym}_1d") or self._cache_stale(f"{sym}_1d")
+                if cached:
+                    results[sym] = cached
             return results
 
-        tickers = yf.Tickers(" ".join(symbols_to_fetch))
-        for sym, ticker in tickers.tickers.items():
-            data = self.get_live_stock_data(sym)
-            if data:
-                results[sym] = data
-            time.sleep(1)  # spacing requests
+        for sym in symbols:
+            hist = histories.get(sym)
+            if hist is None:
+                # Not in the bulk response: fall back to the single-symbol path
+                data = self.get_live_stock_data(sym)
+                if data:
+                    results[sym] = data
+                continue
+
+            info = self._cache_get(f"{sym}_info")
+            if info is None and with_info:
+                try:
+                    info = self._get_info(sym)
+                except Exception as e:
+                    print(f"[WARN] Info lookup failed for {sym}: {e}")
+            info = info or {}
+
+            latest = hist.iloc[-1]
+            prev_close = info.get('previousClose')
+            if prev_close is None:
+                prev_close = hist['Close'].iloc[-2] if len(hist) > 1 else latest['Close']
+            data = self._build_quote(sym, latest, float(prev_close), info)
+            self._cache_set(f"{sym}_1d", data)
+            results[sym] = data
 
         return results
 
+    # ---- Deadline-bounded fan-out ----
+    def _timed_fetch(self, symbols: List[str]):
+        start = time.perf_counter()
+        quotes = self._flights.do(self._bulk_key(symbols, True), self._fetch_quotes, symbols, True)
+        return quotes, (time.perf_counter() - start) * 1000
+
+    def _note_latency(self, symbol: str, ms: float, alpha: float = 0.3):
+        prev = self._fetch_latency.get(symbol)
+        self._fetch_latency[symbol] = ms if prev is None else prev + alpha * (ms - prev)
+
+    def fan_out_quotes(self, symbols: List[str], deadline: Optional[float] = None) -> Dict:
+        """
+        Quotes for `symbols` within `deadline` seconds.
+
+        Cache misses are split into batches of `fanout_chunk` symbols that are
+        downloaded concurrently, so one slow or throttled batch only delays
+        its own symbols. The dashboards show names, market caps and market
+        state, so company info that isn't cached yet is fetched alongside
+        (once a day per symbol). Whatever hasn't arrived by the deadline is
+        served from stale cache if possible and otherwise reported missing;
+        the late batches keep running and warm the cache for the next request.
+        """
+        deadline = self.fanout_deadline if deadline is None else deadline
+        start = time.perf_counter()
+        self._record_access(symbols)
+
+        quotes, stale, latency = {}, [], {}
+        pending = []
+        for sym in symbols:
+            key = f"{sym}_1d"
+            cached = self._cache_get(key)
+            if cached:
+                quotes[sym] = cached
+                latency[sym] = 0.0
+                continue
+            recent = self._cache_stale(key, self.swr_max_stale)
+            if recent:
+                quotes[sym] = recent
+                stale.append(sym)
+                self._revalidate(key, self._fetch_quote, sym, "1d")
+            else:
+                pending.append(sym)
+
+        futures = {
+            self._fanout.submit(self._timed_fetch, pending[i:i + self.fanout_chunk]): pending[i:i + self.fanout_chunk]
+            for i in range(0, len(pending), self.fanout_chunk)
+        }
+        done, not_done = wait(futures, timeout=max(0.0, deadline - (time.perf_counter() - start)))
+
+        timed_out = []
+        for future, batch in futures.items():
+            fetched, ms = future.result() if future in done and future.exception() is None else ({}, None)
+            for sym in batch:
+                if ms is not None:
+                    latency[sym] = round(ms, 1)
+                    self._note_latency(sym, ms)
+                data = fetched.get(sym)
+                if data is None:
+                    if future in not_done:
+                        timed_out.append(sym)
+                    data = self._cache_get(f"{sym}_1d") or self._cache_stale(f"{sym}_1d")
+                if data:
+                    quotes[sym] = data
+                    if data.get('stale'):
+                        stale.append(sym)
+
+        return {
+            'quotes': {sym: quotes[sym] for sym in symbols if sym in quotes},
+            'missing': [sym for sym in symbols if sym not in quotes],
+            'stale': [sym for sym in symbols if sym in stale],
+            'timed_out': timed_out,
+            'latency_ms': latency,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+            'deadline_ms': round(deadline * 1000, 1),
+            'complete': len(quotes) == len(symbols) and not stale,
+        }
+
+    def latency_stats(self, limit: int = 10) -> Dict[str, float]:
+        """Slowest symbols by smoothed fan-out fetch latency (ms)"""
+        slowest = sorted(self._fetch_latency.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return {sym: round(ms, 1) for sym, ms in slowest}
+
     # ---- Market Overview ----
-    def get_market_overview(self) -> Dict:
-        return self.get_multiple_stocks_data(self.major_indices)
+    def market_overview_report(self, deadline: Optional[float] = None) -> Dict:
+        return self.fan_out_quotes(self.major_indices, deadline)
+
+    def get_market_overview(self, deadline: Optional[float] = None) -> Dict:
+        return self.market_overview_report(deadline)['quotes']
 
     # ---- Trending Stocks ----
-    def get_trending_stocks(self, limit: int = 10) -> List[Dict]:
-        data_dict = self.get_multiple_stocks_data(self.popular_stocks)
-        trending = [d for d in data_dict.values() if d.get('volume', 0) > 1_000_000]
-        trending.sort(key=lambda x: abs(x['change_percent']) * x['volume'], reverse=True)
-        return trending[:limit]
+    def trending_report(self, limit: int = 10, deadline: Optional[float] = None) -> Dict:
+        report = self.fan_out_quotes(self.popular_stocks, deadline)
+        quotes = report.pop('quotes')
+        trending = [d for d in quotes.values() if (d.get('volume') or 0) > 1_000_000]
+        trending.sort(key=lambda x: abs(x.get('change_percent') or 0) * x['volume'], reverse=True)
+        return {'trending': trending[:limit], **report}
+
+    def get_trending_stocks(self, limit: int = 10, deadline: Optional[float] = None) -> List[Dict]:
+        return self.trending_report(limit, deadline)['trending']
 
     # ---- Technical Indicators ----
     def calculate_technical_indicators(self, symbol: str, period: str = "3mo") -> Dict:
-        ticker = self._safe_yf_ticker(symbol)
-        if not ticker:
-            return {}
-        hist = ticker.history(period=period)
-        if hist.empty:
-            return {}
+        # Daily bars come from the local store; indicators are memoized on the symbol's frame
+        frame = market_frames.get(symbol, period, timeout=self.upstream_timeout)
+        return frame.indicators() if frame is not None else {}
 
-        df = hist.copy()
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-
-        latest = df.iloc[-1]
-        return {
-            'sma_20': float(latest['SMA_20']) if not pd.isna(latest['SMA_20']) else None,
-            'sma_50': float(latest['SMA_50']) if not pd.isna(latest['SMA_50']) else None
+    def calculate_universe_indicators(self, symbols: List[str], period: str = "3mo") -> Dict[str, Dict]:
+        """Latest indicators for many symbols at once: one vectorized pass over the stacked bars"""
+        bars = {}
+        for symbol in symbols:
+            frame = market_frames.get(symbol, period, timeout=self.upstream_timeout)
+            if frame is not None:
+                bars[symbol] = frame.bars
+        if not bars:
+            return {}
+        names, close = indicators.stack_bars(bars, 'Close')
+        line, signal = indicators.macd(close)
+        latest = {
+            'sma_20': indicators.sma(close, 20)[:, -1],
+            'sma_50': indicators.sma(close, 50)[:, -1],
+            'rsi': indicators.rsi(close, 14)[:, -1],
+            'macd': line[:, -1],
+            'macd_signal': signal[:, -1],
+            'volatility': indicators.rolling_std(close, 20)[:, -1],
         }
+        result = {}
+        for row, symbol in enumerate(names):
+            values = {k: (None if pd.isna(v[row]) else float(v[row])) for k, v in latest.items()}
+            values['as_of'] = str(bars[symbol].index[-1].date())
+            result[symbol] = values
+        return result
+
+    def _quote_from_frame(self, symbol: str, frame: MarketFrame) -> Optional[Dict]:
+        """Quote from the frame's last bar when it is today's (still-forming) session"""
+        bars = frame.bars
+        if len(bars) < 2 or bars.index[-1].date() != datetime.now().date():
+            return None
+        info = self._cache_get(f"{symbol}_info") or {}
+        prev_close = float(info.get('previousClose', bars['Close'].iloc[-2]))
+        data = self._build_quote(symbol, bars.iloc[-1], prev_close, info)
+        self._cache_set(f"{symbol}_1d", data)
+        return data
 
     # ---- Investment Recommendation ----
     def get_investment_recommendation(self, symbol: str, user_risk_profile: int = 3) -> Dict:
-        data = self.get_live_stock_data(symbol)
-        tech = self.calculate_technical_indicators(symbol)
+        # One history read feeds both the indicators and, when it has today's bar, the quote
+        frame = market_frames.get(symbol, "3mo", timeout=self.upstream_timeout)
+        data = self._cache_get(f"{symbol}_1d")
+        if not data and frame is not None:
+            self._record_access([symbol])
+            data = self._quote_from_frame(symbol, frame)
+        if not data:
+            data = self.get_live_stock_data(symbol)
+        tech = frame.indicators() if frame is not None else {}
         if not data or not tech:
             return {'error': f'Unable to fetch data for {symbol}'}
 
@@ -0,0 +1,249 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+# Default time-to-live per kind of market data (seconds)
+DEFAULT_TTLS = {
+    'quote': 300,        # live prices go stale quickly
+    'history': 3600,     # daily bars only change once per session
+    'info': 86400,       # company profile / fundamentals
+}
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class _Entry:
+    __slots__ = ('value', 'kind', 'stored_at', 'expires_at', 'size')
+
+    def __init__(self, value, kind, stored_at, expires_at, size):
+        self.value = value
+        self.kind = kind
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.size = size
+
+
+class _Stripe:
+    """One LRU segment with its own lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self.bytes = 0
+
+
+class MarketCache:
+    """
+    Bounded LRU cache with per-kind TTLs for market data.
+
+    Keys are spread over independent lock stripes so concurrent requests for
+    different symbols don't contend on one lock. Each stripe enforces its
+    share of `max_entries` / `max_bytes` by evicting least-recently-used
+    entries. With `disk_dir` set,
+    values are also written to disk and read back on a memory miss, so a
+    restart or an eviction doesn't force an upstream refetch. Expired
+    entries are kept for up to `max_stale` seconds so `get_stale` can serve
+    them when a refetch is not possible.
+    """
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 256 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None, stripes: int = 16,
+                 disk_dir: Optional[str] = None, max_stale: float = 3600):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_stale = max_stale
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self._max_entries = max(1, max_entries // len(self._stripes))
+        self._max_bytes = max(1, max_bytes // len(self._stripes))
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'disk_hits': 0}
+
+    # ---- Internals ----
+    def _stripe(self, key: str) -> _Stripe:
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _count(self, stat: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[stat] += n
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def _insert(self, stripe: _Stripe, key: str, entry: _Entry) -> int:
+        """Insert under the stripe lock; returns the number of evictions"""
+        old = stripe.entries.pop(key, None)
+        if old is not None:
+            stripe.bytes -= old.size
+        stripe.entries[key] = entry
+        stripe.bytes += entry.size
+        evicted = 0
+        while len(stripe.entries) > 1 and (
+            len(stripe.entries) > self._max_entries or stripe.bytes > self._max_bytes
+        ):
+            _, lru = stripe.entries.popitem(last=False)
+            stripe.bytes -= lru.size
+            evicted += 1
+        return evicted
+
+    # ---- Public API ----
+    def get(self, key: str) -> Optional[Any]:
+        """Fresh value for `key`, or None on a miss / expiry"""
+        now = time.time()
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    stripe.entries.move_to_end(key)
+                    value = entry.value
+                else:
+                    if now - entry.expires_at > self.max_stale:
+                        stripe.entries.pop(key)
+                        stripe.bytes -= entry.size
+                    entry = None
+                    self._count('expired')
+        if entry is not None:
+            self._count('hits')
+            return value
+
+        value = self._disk_get(key, now)
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def get_stale(self, key: str, max_stale: Optional[float] = None) -> Optional[Any]:
+        """
+        Value for `key` only if it has expired, and at most `max_stale`
+        seconds ago; fresh entries are for `get`, so anything returned here
+        really is stale.
+        """
+        now = time.time()
+        bound = self.max_stale if max_stale is None else min(max_stale, self.max_stale)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is not None and 0 <= now - entry.expires_at <= bound:
+                return entry.value
+        return None
+
+    def ttl_remaining(self, key: str) -> Optional[float]:
+        """Seconds until `key` expires (negative once expired), None if absent"""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            return None if entry is None else entry.expires_at - time.time()
+
+    def set(self, key: str, value: Any, kind: str = 'quote', ttl: Optional[float] = None):
+        now = time.time()
+        ttl = self.ttls.get(kind, DEFAULT_TTLS['quote']) if ttl is None else ttl
+        entry = _Entry(value, kind, now, now + ttl, estimate_size(value))
+        stripe = self._stripe(key)
+        with stripe.lock:
+            evicted = self._insert(stripe, key, entry)
+        if evicted:
+            self._count('evictions', evicted)
+        self._disk_set(key, entry)
+
+    def delete(self, key: str):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.pop(key, None)
+            if entry is not None:
+                stripe.bytes -= entry.size
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Drop every entry, including the disk tier, so nothing is read back afterwards"""
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+                stripe.bytes = 0
+        if self.disk_dir:
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith(('.pkl', '.tmp')):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    def __contains__(self, key: str) -> bool:
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            return entry is not None and entry.expires_at > time.time()
+
+    def __len__(self) -> int:
+        return sum(len(s.entries) for s in self._stripes)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'entries': len(self),
+            'bytes': sum(s.bytes for s in self._stripes),
+            'max_entries': self._max_entries * len(self._stripes),
+            'max_bytes': self._max_bytes * len(self._stripes),
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else None,
+            'disk_tier': bool(self.disk_dir),
+        })
+        return stats
+
+    # ---- Disk tier ----
+    def _disk_set(self, key: str, entry: _Entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as fh:
+                pickle.dump((key, entry.kind, entry.stored_at, entry.expires_at, entry.value), fh,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[WARN] Cache disk write failed for {key}: {e}")
+
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as fh:
+                stored_key, kind, stored_at, expires_at, value = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARN] Cache disk read failed for {key}: {e}")
+            return None
+        if stored_key != key or expires_at <= now:
+            return None
+
+        # Promote back into memory with the remaining TTL
+        entry = _Entry(value, kind, stored_at, expires_at, estimate_size(value))
+        stripe = self._stripe(key)
+        with stripe.lock:
+            evicted = self._insert(stripe, key, entry)
+        if evicted:
+            self._count('evictions', evicted)
+        self._count('disk_hits')
+        return value
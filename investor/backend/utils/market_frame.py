@@ -0,0 +1,190 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.history_store import history_store
+
+FEATURE_COLUMNS = [
+    'SMA_5', 'SMA_20', 'SMA_50', 'Volatility', 'RSI',
+    'MACD', 'MACD_Signal', 'Price_Change_1d', 'Price_Change_5d',
+    'Price_Change_20d', 'Volume_Ratio'
+]
+
+# Scale-free versions of the features, comparable across symbols (pooled model)
+POOLED_FEATURE_COLUMNS = [
+    'SMA_5_Gap', 'SMA_20_Gap', 'SMA_50_Gap', 'Volatility_Pct', 'RSI',
+    'MACD_Pct', 'MACD_Signal_Pct', 'Price_Change_1d', 'Price_Change_5d',
+    'Price_Change_20d', 'Volume_Ratio'
+]
+
+
+def relative_features(features, close):
+    """Price-level features as fractions of the close; works on scalars or arrays"""
+    return {
+        'SMA_5_Gap': features['SMA_5'] / close - 1,
+        'SMA_20_Gap': features['SMA_20'] / close - 1,
+        'SMA_50_Gap': features['SMA_50'] / close - 1,
+        'Volatility_Pct': features['Volatility'] / close,
+        'RSI': features['RSI'],
+        'MACD_Pct': features['MACD'] / close,
+        'MACD_Signal_Pct': features['MACD_Signal'] / close,
+        'Price_Change_1d': features['Price_Change_1d'],
+        'Price_Change_5d': features['Price_Change_5d'],
+        'Price_Change_20d': features['Price_Change_20d'],
+        'Volume_Ratio': features['Volume_Ratio'],
+    }
+
+
+class MarketFrame:
+    """
+    Daily bars for one symbol with lazily computed, memoized indicators.
+
+    A frame is immutable: when a new bar arrives the cache builds a new
+    frame, so memoized series never have to be invalidated piecemeal.
+    Returned series/frames are shared between callers and must be treated
+    as read-only.
+    """
+
+    def __init__(self, symbol: str, bars: pd.DataFrame):
+        self.symbol = symbol.upper()
+        self.bars = bars
+        self.signature = self.signature_of(bars)
+        self._memo: Dict[Tuple, object] = {}
+
+    @staticmethod
+    def signature_of(bars: pd.DataFrame) -> Tuple:
+        """Identifies the bar set: a new or updated last bar changes it"""
+        if bars.empty:
+            return (0,)
+        last = bars.iloc[-1]
+        return (len(bars), bars.index[0], bars.index[-1], float(last['Close']), float(last['Volume']))
+
+    def memoize(self, key: Tuple, compute):
+        """Value for `key`, computed on first use and kept for the frame's lifetime"""
+        value = self._memo.get(key)
+        if value is None:
+            value = compute()
+            self._memo[key] = value
+        return value
+
+    @property
+    def close(self) -> pd.Series:
+        return self.bars['Close']
+
+    # ---- Indicators ----
+    def sma(self, window: int) -> pd.Series:
+        return self.memoize(('sma', window), lambda: self.close.rolling(window=window).mean())
+
+    def ema(self, span: int) -> pd.Series:
+        return self.memoize(('ema', span), lambda: self.close.ewm(span=span).mean())
+
+    def volatility(self, window: int = 20) -> pd.Series:
+        return self.memoize(('volatility', window), lambda: self.close.rolling(window=window).std())
+
+    def rsi(self, period: int = 14) -> pd.Series:
+        def compute():
+            delta = self.close.diff()
+            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+            return 100 - (100 / (1 + gain / loss))
+        return self.memoize(('rsi', period), compute)
+
+    def macd(self, fast: int = 12, slow: int = 26) -> pd.Series:
+        return self.memoize(('macd', fast, slow), lambda: self.ema(fast) - self.ema(slow))
+
+    def macd_signal(self, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.Series:
+        return self.memoize(('macd_signal', fast, slow, signal),
+                            lambda: self.macd(fast, slow).ewm(span=signal).mean())
+
+    def pct_change(self, periods: int) -> pd.Series:
+        return self.memoize(('pct_change', periods), lambda: self.close.pct_change(periods))
+
+    def volume_sma(self, window: int = 20) -> pd.Series:
+        return self.memoize(('volume_sma', window), lambda: self.bars['Volume'].rolling(window=window).mean())
+
+    # ---- Derived views ----
+    def features(self) -> pd.DataFrame:
+        """The predictor's feature table (same columns as StockPredictor.create_features)"""
+        def compute():
+            df = self.bars.copy()
+            df['SMA_5'] = self.sma(5)
+            df['SMA_20'] = self.sma(20)
+            df['SMA_50'] = self.sma(50)
+            df['Volatility'] = self.volatility(20)
+            df['RSI'] = self.rsi(14)
+            df['MACD'] = self.macd()
+            df['MACD_Signal'] = self.macd_signal()
+            df['Price_Change_1d'] = self.pct_change(1)
+            df['Price_Change_5d'] = self.pct_change(5)
+            df['Price_Change_20d'] = self.pct_change(20)
+            df['Volume_SMA'] = self.volume_sma(20)
+            df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
+            return df.dropna()
+        return self.memoize(('features',), compute)
+
+    def indicators(self) -> Dict:
+        """Latest indicator values (None while there isn't enough history)"""
+        def latest(series: pd.Series) -> Optional[float]:
+            value = series.iloc[-1] if len(series) else np.nan
+            return None if pd.isna(value) else float(value)
+
+        return self.memoize(('indicators',), lambda: {
+            'sma_20': latest(self.sma(20)),
+            'sma_50': latest(self.sma(50)),
+            'rsi': latest(self.rsi(14)),
+            'macd': latest(self.macd()),
+            'macd_signal': latest(self.macd_signal()),
+            'volatility': latest(self.volatility(20)),
+            'as_of': str(self.bars.index[-1].date()) if len(self.bars) else None,
+        })
+
+
+class MarketFrameCache:
+    """
+    One MarketFrame per (symbol, period), rebuilt only when the history
+    store hands back a different bar set. Reads go through the store, so a
+    frame lookup never downloads more than the missing sessions.
+    """
+
+    def __init__(self, store=history_store, max_frames: int = 256):
+        self.store = store
+        self.max_frames = max_frames
+        self._frames: 'OrderedDict[Tuple[str, str], MarketFrame]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'builds': 0}
+
+    def get(self, symbol: str, period: str = "3mo", timeout: Optional[float] = None) -> Optional[MarketFrame]:
+        bars = self.store.get_history(symbol, period, timeout=timeout)
+        if bars is None or bars.empty:
+            return None
+        return self.from_bars(symbol, period, bars)
+
+    def from_bars(self, symbol: str, period: str, bars: pd.DataFrame) -> MarketFrame:
+        key = (symbol.upper(), period)
+        signature = MarketFrame.signature_of(bars)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None and frame.signature == signature:
+                self._frames.move_to_end(key)
+                self._stats['hits'] += 1
+                return frame
+
+        frame = MarketFrame(symbol, bars)
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+            self._stats['builds'] += 1
+        return frame
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'frames': len(self._frames)}
+
+
+# Global instance
+market_frames = MarketFrameCache()
@@ -0,0 +1,306 @@
+import json
+import os
+from abc import ABC, abstractmethod
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yahoo_fin import stock_info as si
+
+BASE = Path(__file__).resolve().parents[1]
+FIXTURES_DIR = BASE / "data" / "market_fixtures"
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+PERIOD_DAYS = {
+    '1d': 1, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183,
+    '1y': 366, '2y': 731, '5y': 1827, '10y': 3653,
+}
+
+
+def period_days(period: str) -> Optional[int]:
+    """Calendar days covered by a yfinance-style period; None means 'max'"""
+    if period in ('max', 'ytd'):
+        return None if period == 'max' else datetime.now().timetuple().tm_yday
+    return PERIOD_DAYS.get(period)
+
+
+def fixture_name(symbol: str) -> str:
+    return symbol.upper().replace('/', '_').replace('^', 'IDX_')
+
+
+class MarketDataProvider(ABC):
+    """
+    Everything the stock features need from upstream.
+
+    `history` returns a daily OHLCV frame indexed by date (empty when the
+    symbol is unknown), `download` does the same for many symbols in one
+    request, `info` returns the company profile dict and `live_price` the
+    latest traded price. Subclasses must implement `history`, `info` and
+    `live_price`; `download` falls back to one `history` call per symbol.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def history(self, symbol: str, period: Optional[str] = None, start: Optional[str] = None) -> pd.DataFrame:
+        ...
+
+    def download(self, symbols: List[str], period: str = "5d") -> Dict[str, pd.DataFrame]:
+        return {s: h for s in symbols for h in [self.history(s, period=period)] if not h.empty}
+
+    @abstractmethod
+    def info(self, symbol: str) -> Dict:
+        ...
+
+    @abstractmethod
+    def live_price(self, symbol: str) -> float:
+        ...
+
+    def stats(self) -> Dict:
+        return {'provider': self.name}
+
+
+class YahooProvider(MarketDataProvider):
+    """Live data from Yahoo Finance (yfinance, with yahoo_fin for spot prices)"""
+
+    name = 'yahoo'
+
+    def history(self, symbol: str, period: Optional[str] = None, start: Optional[str] = None) -> pd.DataFrame:
+        ticker = yf.Ticker(symbol)
+        if start:
+            return ticker.history(start=start)
+        return ticker.history(period=period or "1mo")
+
+    def download(self, symbols: List[str], period: str = "5d") -> Dict[str, pd.DataFrame]:
+        frame = yf.download(symbols, period=period, group_by='ticker',
+                            threads=True, progress=False, auto_adjust=False)
+        if frame is None or frame.empty:
+            return {}
+
+        histories = {}
+        for symbol in symbols:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if symbol not in frame.columns.get_level_values(0):
+                    continue
+                hist = frame[symbol]
+            else:
+                hist = frame
+            hist = hist.dropna(subset=['Close'])
+            if not hist.empty:
+                histories[symbol] = hist
+        return histories
+
+    def info(self, symbol: str) -> Dict:
+        return yf.Ticker(symbol).info or {}
+
+    def live_price(self, symbol: str) -> float:
+        return float(si.get_live_price(symbol))
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Offline provider that replays OHLCV fixtures from disk.
+
+    Fixtures are `<SYMBOL>.csv` (Date, Open, High, Low, Close, Volume) with
+    an optional `<SYMBOL>.json` info dict, as written by `generate_fixtures`
+    or `record_fixtures`. With `shift_to_today` the dates are moved so the
+    last bar falls on today, which keeps period slicing and the history
+    store's "completed bar" logic meaningful for old fixtures.
+
+    Every call can be delayed by `latency` (+ uniform `jitter`) seconds and
+    fail with probability `failure_rate` (connection error) or
+    `rate_limit_rate` (a 429, which the token bucket reacts to). The
+    injection draws come from a seeded RNG, so a single-threaded run is
+    reproducible.
+    """
+
+    name = 'replay'
+
+    def __init__(self, fixtures_dir: Path = FIXTURES_DIR, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 42,
+                 shift_to_today: bool = True):
+        self.fixtures_dir = Path(fixtures_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.shift_to_today = shift_to_today
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._stats = {'calls': 0, 'failures': 0, 'rate_limited': 0, 'missing': 0}
+
+    # ---- Injection ----
+    def _inject(self):
+        with self._lock:
+            self._stats['calls'] += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            roll = self._rng.random()
+            if roll < self.failure_rate:
+                self._stats['failures'] += 1
+                outcome = 'fail'
+            elif roll < self.failure_rate + self.rate_limit_rate:
+                self._stats['rate_limited'] += 1
+                outcome = '429'
+            else:
+                outcome = None
+        if delay > 0:
+            time.sleep(delay)
+        if outcome == 'fail':
+            raise ConnectionError("Injected upstream failure")
+        if outcome == '429':
+            raise RuntimeError("429 Too Many Requests (injected)")
+
+    # ---- Fixtures ----
+    def _frame(self, symbol: str) -> pd.DataFrame:
+        key = fixture_name(symbol)
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame is not None:
+            return frame
+
+        path = self.fixtures_dir / f"{key}.csv"
+        if not path.exists():
+            with self._lock:
+                self._stats['missing'] += 1
+            return pd.DataFrame(columns=COLUMNS)
+        frame = pd.read_csv(path, index_col='Date', parse_dates=['Date'])[COLUMNS]
+        if self.shift_to_today and not frame.empty:
+            frame.index = frame.index + (pd.Timestamp(datetime.now().date()) - frame.index[-1])
+        with self._lock:
+            self._frames[key] = frame
+        return frame
+
+    def history(self, symbol: str, period: Optional[str] = None, start: Optional[str] = None) -> pd.DataFrame:
+        self._inject()
+        frame = self._frame(symbol)
+        if frame.empty:
+            return frame.copy()
+        if start:
+            return frame[frame.index >= pd.Timestamp(start)].copy()
+        days = period_days(period or "1mo")
+        if days is None:
+            return frame.copy()
+        cutoff = frame.index[-1] - pd.Timedelta(days=days - 1)
+        return frame[frame.index >= cutoff].copy()
+
+    def download(self, symbols: List[str], period: str = "5d") -> Dict[str, pd.DataFrame]:
+        self._inject()  # one request for the whole batch, like yf.download
+        days = period_days(period)
+        histories = {}
+        for symbol in symbols:
+            frame = self._frame(symbol)
+            if frame.empty:
+                continue
+            if days is not None:
+                frame = frame[frame.index >= frame.index[-1] - pd.Timedelta(days=days - 1)]
+            histories[symbol] = frame.copy()
+        return histories
+
+    def info(self, symbol: str) -> Dict:
+        self._inject()
+        path = self.fixtures_dir / f"{fixture_name(symbol)}.json"
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        frame = self._frame(symbol)
+        if frame.empty:
+            return {}
+        prev_close = frame['Close'].iloc[-2] if len(frame) > 1 else frame['Close'].iloc[-1]
+        return {'longName': symbol.upper(), 'previousClose': float(prev_close),
+                'marketState': 'CLOSED', 'currency': 'USD'}
+
+    def live_price(self, symbol: str) -> float:
+        self._inject()
+        frame = self._frame(symbol)
+        if frame.empty:
+            raise ValueError(f"No fixture for {symbol}")
+        return float(frame['Close'].iloc[-1])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'provider': self.name, 'fixtures': str(self.fixtures_dir),
+                    'loaded': len(self._frames), **self._stats}
+
+
+def generate_fixtures(directory: Path, symbols: List[str], days: int = 756, seed: int = 42,
+                      end: str = "2024-12-31") -> List[Path]:
+    """
+    Write synthetic daily OHLCV fixtures (geometric Brownian motion).
+
+    Each symbol gets its own stream derived from (seed, symbol), so a
+    fixture doesn't change when the symbol list does.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    dates = pd.bdate_range(end=end, periods=days, name='Date')
+    paths = []
+    for symbol in symbols:
+        rng = np.random.default_rng([seed, zlib.crc32(symbol.upper().encode())])
+        start_price = rng.uniform(20, 500)
+        drift, vol = rng.uniform(-0.0002, 0.0008), rng.uniform(0.01, 0.03)
+        close = start_price * np.exp(np.cumsum(rng.normal(drift, vol, days)))
+        open_ = np.r_[start_price, close[:-1]] * (1 + rng.normal(0, vol / 4, days))
+        spread = np.abs(rng.normal(0, vol / 2, days))
+        frame = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': rng.integers(500_000, 50_000_000, days).astype(float),
+        }, index=dates)
+        path = directory / f"{fixture_name(symbol)}.csv"
+        frame.to_csv(path)
+        paths.append(path)
+    return paths
+
+
+def record_fixtures(directory: Path, symbols: List[str], period: str = "2y",
+                    provider: Optional[MarketDataProvider] = None) -> List[Path]:
+    """Snapshot real history (and info) from a live provider into fixture files"""
+    provider = provider or YahooProvider()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for symbol in symbols:
+        hist = provider.history(symbol, period=period)
+        if hist.empty:
+            print(f"[WARN] No history to record for {symbol}")
+            continue
+        hist = hist[COLUMNS].copy()
+        hist.index = pd.DatetimeIndex(hist.index).tz_localize(None).normalize().rename('Date')
+        path = directory / f"{fixture_name(symbol)}.csv"
+        hist.to_csv(path)
+        try:
+            with open(directory / f"{fixture_name(symbol)}.json", "w", encoding="utf-8") as fh:
+                json.dump(provider.info(symbol), fh, default=str)
+        except Exception as e:
+            print(f"[WARN] Could not record info for {symbol}: {e}")
+        paths.append(path)
+    return paths
+
+
+def provider_from_env() -> MarketDataProvider:
+    """MARKET_PROVIDER=replay switches every market-data caller to local fixtures"""
+    if os.environ.get('MARKET_PROVIDER', 'yahoo').lower() != 'replay':
+        return YahooProvider()
+    return ReplayProvider(
+        fixtures_dir=Path(os.environ.get('MARKET_FIXTURES_DIR') or FIXTURES_DIR),
+        latency=float(os.environ.get('MARKET_REPLAY_LATENCY_MS', 0)) / 1000,
+        jitter=float(os.environ.get('MARKET_REPLAY_JITTER_MS', 0)) / 1000,
+        failure_rate=float(os.environ.get('MARKET_REPLAY_FAILURE_RATE', 0)),
+        rate_limit_rate=float(os.environ.get('MARKET_REPLAY_429_RATE', 0)),
+        seed=int(os.environ.get('MARKET_REPLAY_SEED', 42)),
+    )
+
+
+# Global instance
+market_provider = provider_from_env()
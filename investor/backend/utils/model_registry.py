@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+
+from utils.market_provider import fixture_name
+
+BASE = Path(__file__).resolve().parents[1]
+MODELS_DIR = BASE / "data" / "stock_models"
+
+
+class ModelRegistry:
+    """
+    Trained stock models keyed by symbol.
+
+    Each symbol's artifact lives in its own file, so training one symbol
+    never overwrites another. Artifacts are written to a temp file and
+    renamed into place, so readers only ever load a complete model. Loaded
+    models are kept in memory in an LRU of `max_models` entries together
+    with the file's mtime; a lookup is a dictionary hit plus one stat(), and
+    an artifact republished by a training worker (in any process) is picked
+    up on the next lookup.
+    """
+
+    def __init__(self, root: Path = MODELS_DIR, max_models: int = 32):
+        self.root = Path(root)
+        self.max_models = max_models
+        self._models: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'loads': 0, 'misses': 0, 'evictions': 0, 'published': 0}
+
+    def path(self, symbol: str) -> Path:
+        return self.root / f"{fixture_name(symbol)}.pkl"
+
+    def _mtime(self, key: str) -> Optional[float]:
+        try:
+            return self.path(key).stat().st_mtime
+        except OSError:
+            return None
+
+    def _remember(self, key: str, model_data: Dict, mtime: Optional[float]):
+        with self._lock:
+            self._models[key] = (mtime, model_data)
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """Model artifact for `symbol` (memory first, then disk), or None if never trained"""
+        key = symbol.upper()
+        mtime = self._mtime(key)
+        with self._lock:
+            cached = self._models.get(key)
+            if cached is not None and (mtime is None or cached[0] == mtime):
+                self._models.move_to_end(key)
+                self._stats['hits'] += 1
+                return cached[1]
+
+        if mtime is None:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        try:
+            model_data = joblib.load(self.path(key))
+        except Exception as e:
+            print(f"[ERROR] Loading model for {key} failed: {e}")
+            return None
+        self._remember(key, model_data, mtime)
+        with self._lock:
+            self._stats['loads'] += 1
+        return model_data
+
+    def put(self, symbol: str, model_data: Dict):
+        """Atomically publish a new artifact for `symbol` and make it the in-memory model"""
+        key = symbol.upper()
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        joblib.dump(model_data, tmp)
+        os.replace(tmp, path)
+        self._remember(key, model_data, self._mtime(key))
+        with self._lock:
+            self._stats['published'] += 1
+
+    def has(self, symbol: str) -> bool:
+        key = symbol.upper()
+        with self._lock:
+            if key in self._models:
+                return True
+        return self.path(key).exists()
+
+    def symbols(self) -> List[str]:
+        """Every symbol with a published model"""
+        if not self.root.exists():
+            return []
+        return sorted(p.stem for p in self.root.glob("*.pkl") if not p.stem.startswith('_') and '@' not in p.stem)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'in_memory': len(self._models), 'max_models': self.max_models}
+
+
+# Global instance
+model_registry = ModelRegistry(max_models=int(os.environ.get('STOCK_MODEL_CACHE_SIZE', 32)))
@@ -0,0 +1,171 @@
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+BASE = Path(__file__).resolve().parents[1]
+CSV_PATH = BASE / "data" / "financial_data.csv"
+SNAPSHOT_PATH = BASE / "data" / "peer_index.npz"
+
+# Age cohorts: [18-25], [26-35], ... upper edges are inclusive
+COHORT_EDGES = np.array([25, 35, 45, 55, 65])
+COHORT_LABELS = ["18-25", "26-35", "36-45", "46-55", "56-65", "66+"]
+
+METRIC_EDGES = {
+    # savings rate in %, 0.5-point bins; values outside are clipped to the ends
+    'savings_rate': np.linspace(-100, 100, 401),
+    # income on a log scale
+    'income': np.logspace(3, 8, 201),
+}
+
+
+def cohort_of(age) -> np.ndarray:
+    """Cohort index for each age"""
+    return np.searchsorted(COHORT_EDGES, np.asarray(age, dtype=float), side='left')
+
+
+def savings_rate(income, expenses) -> np.ndarray:
+    income = np.asarray(income, dtype=float)
+    expenses = np.asarray(expenses, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(income > 0, (income - expenses) / income * 100, 0.0)
+
+
+class PeerIndex:
+    """
+    Fixed-histogram quantile sketch of savings rate and income per age cohort.
+
+    Counts live in a (cohorts, bins) array per metric, so adding a profile is
+    one increment and a percentile lookup is a searchsorted over the bin
+    edges plus a read from the cached prefix sums (rebuilt only after new
+    data arrives).
+    """
+
+    def __init__(self):
+        self.counts = {m: np.zeros((len(COHORT_LABELS), len(e) - 1)) for m, e in METRIC_EDGES.items()}
+        self.records_seen = 0
+        self._cumulative = {}
+        self._lock = threading.Lock()
+
+    # ---- Updates ----
+    def _bin(self, metric: str, values) -> np.ndarray:
+        edges = METRIC_EDGES[metric]
+        idx = np.searchsorted(edges, np.asarray(values, dtype=float), side='right') - 1
+        return np.clip(idx, 0, len(edges) - 2)
+
+    def add_many(self, income, expenses, age):
+        """Add a batch of profiles (vectorized)"""
+        income = np.asarray(income, dtype=float)
+        cohorts = cohort_of(age)
+        values = {'savings_rate': savings_rate(income, expenses), 'income': income}
+        with self._lock:
+            for metric, vals in values.items():
+                np.add.at(self.counts[metric], (cohorts, self._bin(metric, vals)), 1)
+            self._cumulative = {}
+
+    def add(self, income: float, expenses: float, age: int):
+        self.add_many([income], [expenses], [age])
+
+    def add_frame(self, df: pd.DataFrame):
+        """Add rows from a frame with income/expenses/age columns (any case)"""
+        cols = {c.lower(): c for c in df.columns}
+        self.add_many(df[cols['income']], df[cols['expenses']], df[cols['age']])
+
+    def add_records(self, records: Iterable[Dict]):
+        """Add stored /predict records not yet seen by the index"""
+        records = list(records)
+        with self._lock:
+            # Claim the new ids first so concurrent requests can't add them twice
+            new = [r for r in records if r.get('id', 0) > self.records_seen]
+            if not new:
+                return 0
+            self.records_seen = max(r['id'] for r in new)
+        self.add_frame(pd.DataFrame(new))
+        return len(new)
+
+    # ---- Queries ----
+    def _prefix(self, metric: str, cohort: Optional[int]) -> np.ndarray:
+        # Under the lock: a prefix built while add_many is halfway through a
+        # batch would otherwise stay cached until the next update
+        key = (metric, cohort)
+        with self._lock:
+            prefix = self._cumulative.get(key)
+            if prefix is None:
+                counts = self.counts[metric]
+                row = counts.sum(axis=0) if cohort is None else counts[cohort]
+                prefix = np.concatenate([[0.0], np.cumsum(row)])
+                self._cumulative[key] = prefix
+        return prefix
+
+    def percentile(self, metric: str, value: float, age: Optional[int] = None) -> Dict:
+        """Share of peers (in the age cohort, or everyone) below `value`"""
+        cohort = int(cohort_of(age)) if age else None
+        prefix = self._prefix(metric, cohort)
+        total = prefix[-1]
+        if total == 0:
+            return {'percentile': None, 'sample_size': 0}
+
+        edges = METRIC_EDGES[metric]
+        value = float(np.clip(value, edges[0], edges[-1]))
+        i = int(self._bin(metric, value))
+        # Linear interpolation inside the bin that holds the value
+        frac = (value - edges[i]) / (edges[i + 1] - edges[i])
+        below = prefix[i] + frac * (prefix[i + 1] - prefix[i])
+        return {'percentile': round(float(below / total * 100), 1), 'sample_size': int(total)}
+
+    def benchmark(self, income: float, expenses: float, age: Optional[int] = None) -> Dict:
+        """Savings-rate and income percentiles for one profile"""
+        rate = float(savings_rate(income, expenses))
+        saving = self.percentile('savings_rate', rate, age)
+        earning = self.percentile('income', income, age)
+        cohort = COHORT_LABELS[int(cohort_of(age))] if age else "all"
+        result = {
+            'cohort': cohort,
+            'savings_rate_percentile': saving['percentile'],
+            'income_percentile': earning['percentile'],
+            'sample_size': saving['sample_size'],
+        }
+        if saving['percentile'] is not None:
+            peers = "peers in your age group" if age else "peers"
+            result['message'] = f"You save more than {saving['percentile']:.0f}% of {peers}."
+        return result
+
+    # ---- Persistence ----
+    def save(self, path: Path = SNAPSHOT_PATH):
+        np.savez(path, records_seen=self.records_seen,
+                 **{f"counts_{m}": c for m, c in self.counts.items()})
+
+    def load(self, path: Path = SNAPSHOT_PATH) -> bool:
+        if not Path(path).exists():
+            return False
+        try:
+            snap = np.load(path)
+            counts = {m: snap[f"counts_{m}"] for m in METRIC_EDGES}
+        except Exception as e:
+            print(f"[WARN] Could not load peer index snapshot: {e}")
+            return False
+        if any(counts[m].shape != self.counts[m].shape for m in METRIC_EDGES):
+            print("[WARN] Peer index snapshot has a different layout, rebuilding")
+            return False
+        with self._lock:
+            self.counts = counts
+            self.records_seen = int(snap['records_seen'])
+            self._cumulative = {}
+        return True
+
+    def warm_up(self, records: Iterable[Dict] = ()):
+        """Load the snapshot (or build from the CSV), then catch up on new records"""
+        if not self.load():
+            if CSV_PATH.exists():
+                self.add_frame(pd.read_csv(CSV_PATH, usecols=['Income', 'Expenses', 'Age']))
+        added = self.add_records(list(records))
+        try:
+            self.save()
+        except OSError as e:
+            print(f"[WARN] Could not save peer index snapshot: {e}")
+        print(f"[INFO] Peer index ready ({int(self.counts['income'].sum())} profiles, {added} new records)")
+
+
+# Global instance
+peer_index = PeerIndex()
@@ -0,0 +1,118 @@
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from utils.live_data_service import live_data_service
+
+
+class PrefetchScheduler:
+    """
+    Background thread that keeps the quote cache warm.
+
+    Every tick it looks at the fixed universes (popular stocks, major
+    indices) plus the symbols hottest in recent traffic, and bulk-refreshes
+    the ones whose cached quote is missing or expires within `lead_time`.
+    Ticks are jittered so several workers don't hit upstream in lockstep,
+    and failed refreshes back off exponentially.
+    """
+
+    def __init__(self, service=live_data_service, interval: float = 60.0, lead_time: float = 90.0,
+                 jitter: float = 0.2, hot_limit: int = 20, max_backoff: float = 600.0,
+                 decay_every: int = 10):
+        self.service = service
+        self.interval = interval
+        self.lead_time = lead_time
+        self.jitter = jitter
+        self.hot_limit = hot_limit
+        self.max_backoff = max_backoff
+        self.decay_every = decay_every
+        self._failures = 0
+        self._ticks = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'runs': 0, 'refreshed': 0, 'failures': 0, 'last_run': None, 'next_delay': None}
+
+    # ---- Planning ----
+    def universe(self) -> List[str]:
+        symbols = self.service.major_indices + self.service.popular_stocks
+        symbols += self.service.hot_symbols(self.hot_limit)
+        return list(dict.fromkeys(symbols))  # de-duplicate, keep order
+
+    def due_symbols(self) -> List[str]:
+        """Symbols with no cached quote or one expiring within `lead_time`"""
+        due = []
+        for symbol in self.universe():
+            remaining = self.service.cache.ttl_remaining(f"{symbol}_1d")
+            if remaining is None or remaining < self.lead_time:
+                due.append(symbol)
+        return due
+
+    def _next_delay(self) -> float:
+        base = self.interval
+        if self._failures:
+            base = min(self.max_backoff, self.interval * 2 ** self._failures)
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    # ---- Loop ----
+    def run_once(self) -> int:
+        """Refresh whatever is due; returns the number of symbols refreshed"""
+        due = self.due_symbols()
+        refreshed = 0
+        if due:
+            try:
+                # Prefetched quotes back the dashboards, so keep their profile fields filled
+                results = self.service.get_multiple_stocks_data(due, with_info=True, refresh=True)
+                refreshed = sum(1 for d in results.values() if not d.get('stale'))
+            except Exception as e:
+                print(f"[WARN] Prefetch failed: {e}")
+            if refreshed == 0:
+                self._failures += 1
+                self._stats['failures'] += 1
+            else:
+                self._failures = 0
+
+        self._ticks += 1
+        if self._ticks % self.decay_every == 0:
+            self.service.decay_access_counts()
+
+        self._stats['runs'] += 1
+        self._stats['refreshed'] += refreshed
+        self._stats['last_run'] = time.time()
+        return refreshed
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            delay = self._next_delay()
+            self._stats['next_delay'] = round(delay, 1)
+            self._stop.wait(delay)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="market-prefetch", daemon=True)
+        self._thread.start()
+        print(f"[INFO] Market prefetch scheduler started (every ~{self.interval:.0f}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            'running': bool(self._thread and self._thread.is_alive()),
+            'consecutive_failures': self._failures,
+            'universe_size': len(self.universe()),
+        }
+
+
+# Global instance; refresh well inside the 5-minute quote TTL
+prefetch_scheduler = PrefetchScheduler(
+    interval=float(os.environ.get('MARKET_PREFETCH_INTERVAL', 60)),
+    lead_time=float(os.environ.get('MARKET_PREFETCH_LEAD', 90)),
+)
@@ -0,0 +1,64 @@
+import multiprocessing as mp
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence
+
+
+class SharedProcessPool:
+    """
+    One ProcessPoolExecutor shared by every caller, created on first use.
+
+    Workers are spawned rather than forked, so they never inherit the
+    server's threads, locks or open connections; a spawned worker
+    re-imports the main module, which is why app.py keeps its startup work
+    behind `__main__`. A pool that breaks (a worker crashed or was killed)
+    is discarded and the next call starts a fresh one.
+    """
+
+    def __init__(self, max_workers: int, name: str = "process"):
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self.context = mp.get_context('spawn')
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def start_method(self) -> str:
+        return self.context.get_start_method()
+
+    def get(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.context)
+            return self._pool
+
+    def reset(self, pool: Optional[ProcessPoolExecutor] = None):
+        """Discard the pool; with `pool`, only if it is still the current one"""
+        with self._lock:
+            if self._pool is None or (pool is not None and pool is not self._pool):
+                return
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def map(self, fn: Callable, items: Sequence) -> List:
+        """
+        `fn` over `items`, in the pool when there is more than one worker
+        and more than one item, otherwise in this process. If the pool
+        breaks the work is redone in-process.
+        """
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        pool = self.get()
+        try:
+            return list(pool.map(fn, items))
+        except BrokenProcessPool as e:
+            print(f"[WARN] {self.name} pool crashed, running in-process: {e}")
+            self.reset(pool)
+            return [fn(item) for item in items]
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
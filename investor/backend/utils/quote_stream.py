@@ -0,0 +1,184 @@
+import json
+import os
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.live_data_service import live_data_service
+
+# Fields that change on every rebuild and shouldn't by themselves trigger an update
+VOLATILE_FIELDS = {'last_updated'}
+
+
+class Subscription:
+    """One client's view of the stream: its symbols and a bounded outbox"""
+
+    def __init__(self, symbols: Iterable[str], max_queue: int):
+        self.symbols: Set[str] = set(symbols)
+        self.queue: 'queue.Queue[Dict]' = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+class QuoteStream:
+    """
+    Single upstream poller shared by every streaming client.
+
+    Each tick refreshes the union of all subscribed symbols with one bulk
+    call, diffs every quote against the last one sent and pushes only the
+    changed fields to the clients watching that symbol. Upstream load is
+    one batch per tick however many dashboards are open. A client whose
+    outbox fills up is marked overflowed and gets a fresh snapshot instead
+    of the backlog. The poller thread starts with the first subscriber and
+    exits once the last one leaves.
+    """
+
+    def __init__(self, service=live_data_service, interval: float = 15.0, max_queue: int = 200,
+                 max_symbols: int = 200):
+        self.service = service
+        self.interval = interval
+        self.max_queue = max_queue
+        self.max_symbols = max_symbols
+        self._subs: List[Subscription] = []
+        self._last: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'ticks': 0, 'updates_sent': 0, 'overflows': 0, 'upstream_batches': 0}
+
+    # ---- Subscriptions ----
+    def subscribe(self, symbols: Iterable[str]) -> Subscription:
+        sub = Subscription(symbols, self.max_queue)
+        with self._lock:
+            self._subs.append(sub)
+            snapshot = {s: self._last[s] for s in sub.symbols if s in self._last}
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="quote-stream", daemon=True)
+                self._thread.start()
+        if snapshot:
+            sub.queue.put_nowait({'event': 'snapshot', 'quotes': snapshot})
+        if set(sub.symbols) - set(snapshot):
+            self._wake.set()  # new symbols: don't make the client wait a full interval
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def snapshot(self, symbols: Iterable[str]) -> Dict[str, Dict]:
+        with self._lock:
+            return {s: self._last[s] for s in symbols if s in self._last}
+
+    def _watched(self) -> List[str]:
+        with self._lock:
+            symbols = sorted(set().union(*(s.symbols for s in self._subs))) if self._subs else []
+        return symbols[:self.max_symbols]
+
+    # ---- Diffing / fan-out ----
+    @staticmethod
+    def diff(previous: Optional[Dict], current: Dict) -> Dict:
+        """Fields of `current` that differ from `previous` (everything if there is none)"""
+        if previous is None:
+            return dict(current)
+        changed = {k: v for k, v in current.items()
+                   if k not in VOLATILE_FIELDS and previous.get(k) != v}
+        if changed:
+            changed.update({k: current[k] for k in VOLATILE_FIELDS if k in current})
+        return changed
+
+    def _publish(self, quotes: Dict[str, Dict]):
+        changes = {}
+        with self._lock:
+            for symbol, quote in quotes.items():
+                delta = self.diff(self._last.get(symbol), quote)
+                if delta:
+                    changes[symbol] = delta
+                    self._last[symbol] = quote
+            subs = list(self._subs)
+
+        for sub in subs:
+            if sub.overflowed:
+                continue
+            mine = {s: d for s, d in changes.items() if s in sub.symbols}
+            if not mine:
+                continue
+            try:
+                sub.queue.put_nowait({'event': 'quote', 'changes': mine})
+                self._stats['updates_sent'] += len(mine)
+            except queue.Full:
+                sub.overflowed = True
+                self._stats['overflows'] += 1
+
+    def poll_once(self) -> int:
+        """Refresh every watched symbol in one batch; returns the number of symbols that changed"""
+        symbols = self._watched()
+        if not symbols:
+            return 0
+        try:
+            quotes = self.service.get_multiple_stocks_data(symbols, refresh=True)
+            self._stats['upstream_batches'] += 1
+        except Exception as e:
+            print(f"[WARN] Quote stream poll failed: {e}")
+            return 0
+        before = self._stats['updates_sent']
+        self._publish({s: q for s, q in quotes.items() if q})
+        self._stats['ticks'] += 1
+        return self._stats['updates_sent'] - before
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if not self._subs:
+                    self._thread = None
+                    return
+            self.poll_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # ---- SSE ----
+    def events(self, symbols: Iterable[str], keepalive: float = 20.0):
+        """Server-sent-event lines for a new subscription (runs until the client disconnects)"""
+        sub = self.subscribe(symbols)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if sub.overflowed:
+                    sub.overflowed = False
+                    sub.drain()  # the snapshot supersedes the backlog
+                    message = {'event': 'snapshot', 'quotes': self.snapshot(sub.symbols)}
+                else:
+                    message = sub.get(timeout=keepalive)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event = message.pop('event')
+                yield f"event: {event}\ndata: {json.dumps(message, default=str)}\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                'subscribers': len(self._subs),
+                'symbols': len(set().union(*(s.symbols for s in self._subs))) if self._subs else 0,
+                'running': bool(self._thread and self._thread.is_alive()),
+                'interval': self.interval,
+            }
+
+
+# Global instance
+quote_stream = QuoteStream(interval=float(os.environ.get('MARKET_STREAM_INTERVAL', 15)))
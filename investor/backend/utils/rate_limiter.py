@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class UpstreamThrottled(Exception):
+    """No upstream slot was available before the caller's deadline"""
+
+
+class TokenBucket:
+    """
+    Process-wide token bucket for upstream market-data calls.
+
+    Callers queue FIFO for a token. A caller fails fast (returns False)
+    instead of sleeping when the queue is full or when the earliest time it
+    could be served is past its deadline, so request threads can fall back
+    to cached data. Upstream 429s trigger a shared exponential back-off
+    rather than per-thread sleeps.
+    """
+
+    def __init__(self, rate: float = 2.0, capacity: int = 5, max_queue: int = 32,
+                 max_backoff: float = 60.0):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.max_queue = int(max_queue)
+        self.max_backoff = float(max_backoff)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_limits = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stats = {'acquired': 0, 'throttled': 0, 'rate_limited': 0, 'wait_seconds': 0.0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _eta(self, position: int, now: float) -> float:
+        """Seconds until the caller at `position` in the queue could get a token"""
+        blocked = max(0.0, self._blocked_until - now)
+        needed = max(0.0, position + 1 - self._tokens)
+        return blocked + needed / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take one token, waiting at most `timeout` seconds (None waits indefinitely)"""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        ticket = object()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._stats['throttled'] += 1
+                return False
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    position = self._queue.index(ticket)
+                    if position == 0 and now >= self._blocked_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        self._stats['acquired'] += 1
+                        self._stats['wait_seconds'] += now - start
+                        return True
+
+                    wait = self._eta(position, now)
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0 or wait > remaining:
+                            self._stats['throttled'] += 1
+                            return False
+                        wait = min(wait, remaining)
+                    self._cond.wait(max(wait, 0.001))
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def call(self, fn, *args, timeout: Optional[float] = None, **kwargs):
+        """Run `fn` under the limiter, feeding 429 responses back into the back-off"""
+        if not self.acquire(timeout):
+            raise UpstreamThrottled(getattr(fn, '__name__', 'upstream call'))
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if "429" in str(e) or "Too Many Requests" in str(e):
+                self.report_rate_limited()
+            raise
+        self.report_success()
+        return result
+
+    def report_rate_limited(self):
+        """Upstream answered 429: pause every caller with exponential back-off"""
+        with self._cond:
+            self._consecutive_limits += 1
+            pause = min(self.max_backoff, 2 ** (self._consecutive_limits - 1))
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            self._tokens = 0.0
+            self._stats['rate_limited'] += 1
+            self._cond.notify_all()
+        print(f"[429] Upstream rate limit, pausing market-data calls for {pause}s")
+
+    def report_success(self):
+        if self._consecutive_limits:
+            with self._cond:
+                self._consecutive_limits = 0
+
+    def stats(self) -> Dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            stats = dict(self._stats)
+            stats.update({
+                'tokens': round(self._tokens, 2),
+                'capacity': self.capacity,
+                'rate_per_sec': self.rate,
+                'queue_depth': len(self._queue),
+                'blocked_for': round(max(0.0, self._blocked_until - now), 2),
+            })
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        return stats
+
+
+# Global instance shared by every market-data caller in the process
+upstream_limiter = TokenBucket(
+    rate=float(os.environ.get('MARKET_RATE_PER_SEC', 2)),
+    capacity=int(os.environ.get('MARKET_RATE_BURST', 5)),
+    max_queue=int(os.environ.get('MARKET_RATE_MAX_QUEUE', 32)),
+)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Iterator, List, Optional
+
+SAVINGS_SUGGESTIONS = np.array([
+    "Your savings rate is low — reduce discretionary spending.",
+    "Moderate savings — try budgeting 50-30-20 rule.",
+    "Excellent savings habit — increase SIP amount for faster growth!",
+], dtype=object)
+
+HEALTH_CATEGORIES = np.array([
+    "Needs Improvement 😟",
+    "Growing Investor 🚀",
+    "Smart Wealth Builder 💰",
+], dtype=object)
+
+SCORE_COLUMNS = ['savings', 'savings_rate', 'score', 'category', 'suggestion']
+
+
+def score_profiles(income, expenses, age, risk) -> Dict[str, np.ndarray]:
+    """
+    Health score and savings suggestion for arrays of profiles.
+
+    Single source of truth for /expense-analyze, /health-score and the batch
+    scorer: the same cut-offs (10%/20% savings, 40/70 score) applied with
+    array operations instead of per-row branches.
+    """
+    income = np.asarray(income, dtype=float)
+    expenses = np.asarray(expenses, dtype=float)
+    age = np.asarray(age, dtype=float)
+    risk = np.asarray(risk, dtype=float)
+
+    savings = income - expenses
+    with np.errstate(divide='ignore', invalid='ignore'):
+        savings_rate = np.where(income > 0, savings / income * 100, 0.0)
+
+    score = (
+        np.minimum(40, savings_rate * 2)          # max 40 points
+        + np.where(risk >= 3, 30, 20)             # risk profile
+        + np.where(age < 40, 30, 20)              # age advantage
+    )
+
+    category = HEALTH_CATEGORIES[np.searchsorted([40, 70], score, side='right')]
+    suggestion = SAVINGS_SUGGESTIONS[np.searchsorted([10, 20], savings_rate, side='right')]
+
+    return {
+        'savings': savings,
+        'savings_rate': savings_rate,
+        'score': score,
+        'category': category,
+        'suggestion': suggestion,
+    }
+
+
+def score_one(income: float, expenses: float, age: int = 0, risk: int = 3) -> Dict:
+    """Scalar wrapper used by the single-profile endpoints"""
+    scored = score_profiles([income], [expenses], [age], [risk])
+    return {k: (v[0].item() if hasattr(v[0], 'item') else v[0]) for k, v in scored.items()}
+
+
+def _normalise(df: pd.DataFrame) -> pd.DataFrame:
+    """Accept both records-table (income) and CSV (Income) column names"""
+    df = df.rename(columns={c: c.lower() for c in df.columns})
+    if 'risktolerance' in df.columns and 'risk' not in df.columns:
+        df = df.rename(columns={'risktolerance': 'risk'})
+    for col, default in (('age', 0), ('risk', 3)):
+        if col not in df.columns:
+            df[col] = default
+    return df
+
+
+def score_frame(df: pd.DataFrame, keep: Optional[List[str]] = None) -> pd.DataFrame:
+    """Score every row of a frame; `keep` columns are copied to the output"""
+    df = _normalise(df)
+    keep = [c for c in (keep or ['id', 'income', 'expenses', 'age', 'risk']) if c in df.columns]
+    scored = score_profiles(
+        df['income'].to_numpy(), df['expenses'].to_numpy(),
+        df['age'].to_numpy(), df['risk'].to_numpy(),
+    )
+    out = df[keep].reset_index(drop=True)
+    for col in SCORE_COLUMNS:
+        out[col] = scored[col]
+    out['score'] = out['score'].round().astype(int)
+    out['savings_rate'] = out['savings_rate'].round(2)
+    return out
+
+
+def iter_chunks(records: Iterable[Dict], chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Group an iterable of record dicts into DataFrame chunks"""
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= chunk_size:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+
+def score_to_parquet(chunks: Iterable[pd.DataFrame], out_path: str) -> int:
+    """Score chunks one at a time and append them to a Parquet file"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    total = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(score_frame(chunk), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out_path, table.schema)
+            elif table.schema != writer.schema:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            total += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Optional
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while
+    it is in flight wait for and share its result (or its exception). Once
+    the call finishes the key is released, so the next miss fetches again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._stats = {'executed': 0, 'coalesced': 0}
+
+    def _claim(self, key: str):
+        """Return (future, is_leader) for `key`"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._stats['executed'] += 1
+            return future, True
+
+    def _run(self, key: str, future: Future, fn: Callable, args, kwargs):
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def do(self, key: str, fn: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """Run `fn` once per in-flight `key` and return the shared result"""
+        future, leader = self._claim(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        return future.result(timeout)
+
+    def do_async(self, key: str, executor: Executor, fn: Callable, *args, **kwargs) -> Future:
+        """Start `fn` on `executor` unless `key` is already in flight; never blocks"""
+        future, leader = self._claim(key)
+        if leader:
+            executor.submit(self._run, key, future, fn, args, kwargs)
+        return future
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._calls)}
@@ -1,77 +1,58 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import r2_score
 from sklearn.model_selection import train_test_split
-import joblib
+import copy
+import time
 from datetime import datetime, timedelta
-import os
+
+from utils import indicators
+from utils.feature_engine import feature_engine
+from utils.history_store import history_store
+from utils.market_frame import (
+    FEATURE_COLUMNS, POOLED_FEATURE_COLUMNS, MarketFrame, market_frames, relative_features,
+)
+from utils.model_registry import model_registry
+
+# Registry key of the model trained across many symbols
+POOLED_MODEL_KEY = '_POOLED'
+# Horizons (trading days) of the multi-horizon model, and its registry key suffix
+HORIZONS = (1, 5, 10, 20)
+MULTI_SUFFIX = '@MULTI'
+
 
 class StockPredictor:
-    def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
-        self.model_path = os.path.join(os.path.dirname(__file__), '..', 'stock_model.pkl')
+    def __init__(self, registry=model_registry):
+        # One model per symbol; training a symbol never replaces another symbol's model
+        self.registry = registry
+        self._predictions = {}
         
     def get_stock_data(self, symbol, period="2y"):
-        """Fetch stock data from Yahoo Finance"""
+        """Daily bars from the local history store, topped up from Yahoo Finance"""
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period)
+            data = history_store.get_history(symbol, period)
             return data
         except Exception as e:
             print(f"Error fetching data for {symbol}: {e}")
             return None
     
+    def get_market_frame(self, symbol, period="2y"):
+        """Shared per-symbol frame: the same bars and memoized indicators the live service uses"""
+        try:
+            return market_frames.get(symbol, period)
+        except Exception as e:
+            print(f"Error fetching data for {symbol}: {e}")
+            return None
+
     def create_features(self, data):
-        """Create technical indicators and features for prediction"""
-        df = data.copy()
-        
-        # Price-based features
-        df['SMA_5'] = df['Close'].rolling(window=5).mean()
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-        
-        # Volatility
-        df['Volatility'] = df['Close'].rolling(window=20).std()
-        
-        # RSI
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['Close'].ewm(span=12).mean()
-        exp2 = df['Close'].ewm(span=26).mean()
-        df['MACD'] = exp1 - exp2
-        df['MACD_Signal'] = df['MACD'].ewm(span=9).mean()
-        
-        # Price change features
-        df['Price_Change_1d'] = df['Close'].pct_change(1)
-        df['Price_Change_5d'] = df['Close'].pct_change(5)
-        df['Price_Change_20d'] = df['Close'].pct_change(20)
-        
-        # Volume features
-        df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
-        df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
-        
-        # Drop NaN values
-        df = df.dropna()
-        
-        return df
+        """Create technical indicators and features for the whole table (training); see feature_engine for the latest row"""
+        return MarketFrame('', data).features()
     
     def prepare_training_data(self, df, target_days=5):
         """Prepare data for training"""
-        features = [
-            'SMA_5', 'SMA_20', 'SMA_50', 'Volatility', 'RSI', 
-            'MACD', 'MACD_Signal', 'Price_Change_1d', 'Price_Change_5d', 
-            'Price_Change_20d', 'Volume_Ratio'
-        ]
-        
-        X = df[features].values
+        X = df[FEATURE_COLUMNS].values
         y = df['Close'].shift(-target_days).values  # Predict future price
         
         # Remove last target_days rows where y is NaN
@@ -81,24 +62,32 @@ class StockPredictor:
         
         return X, y
     
-    def train_model(self, symbol, period="2y"):
+    def train_model(self, symbol, period="2y", target_days=5, progress=None):
         """Train the stock prediction model"""
         print(f"Training model for {symbol}...")
         
         # Get data
-        data = self.get_stock_data(symbol, period)
-        if data is None or len(data) < 100:
+        frame = self.get_market_frame(symbol, period)
+        if frame is None or len(frame.bars) < 100:
             print(f"Insufficient data for {symbol}")
             return False
         
-        # Create features
-        df = self.create_features(data)
+        return self.train_from_features(symbol, frame.features(), period, target_days, progress)
+    
+    def train_from_features(self, symbol, df, period="2y", target_days=5, progress=None, step=10):
+        """
+        Fit a model on a prepared feature table and publish it to the registry.
+        `progress(fraction, stage)` is called as trees are added; the forest is
+        grown `step` trees at a time with warm_start, which gives exactly the
+        same model as a single fit.
+        """
+        report = progress or (lambda fraction, stage: None)
         if len(df) < 50:
             print(f"Insufficient features for {symbol}")
             return False
         
         # Prepare training data
-        X, y = self.prepare_training_data(df)
+        X, y = self.prepare_training_data(df, target_days)
         
         if len(X) < 30:
             print(f"Insufficient training data for {symbol}")
@@ -110,102 +99,367 @@ class StockPredictor:
         )
         
         # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        report(0.1, 'fitting')
         
         # Train model
-        self.model = RandomForestRegressor(
-            n_estimators=100,
+        n_estimators = 100
+        model = RandomForestRegressor(
+            n_estimators=step,
             max_depth=10,
             random_state=42,
-            n_jobs=-1
+            n_jobs=-1,
+            warm_start=True
         )
-        
-        self.model.fit(X_train_scaled, y_train)
+        self._grow_forest(model, X_train_scaled, y_train, n_estimators, step, report)
         
         # Evaluate
-        train_score = self.model.score(X_train_scaled, y_train)
-        test_score = self.model.score(X_test_scaled, y_test)
+        train_score = model.score(X_train_scaled, y_train)
+        test_score = model.score(X_test_scaled, y_test)
         
         print(f"Training R²: {train_score:.4f}")
         print(f"Test R²: {test_score:.4f}")
+        report(0.95, 'publishing')
         
         # Save model
         model_data = {
-            'model': self.model,
-            'scaler': self.scaler,
-            'features': [
-                'SMA_5', 'SMA_20', 'SMA_50', 'Volatility', 'RSI', 
-                'MACD', 'MACD_Signal', 'Price_Change_1d', 'Price_Change_5d', 
-                'Price_Change_20d', 'Volume_Ratio'
-            ],
-            'symbol': symbol,
+            'model': model,
+            'scaler': scaler,
+            'features': list(FEATURE_COLUMNS),
+            'symbol': symbol.upper(),
+            'period': period,
+            'target_days': target_days,
+            'train_r2': float(train_score),
+            'test_r2': float(test_score),
             'trained_at': datetime.now().isoformat()
         }
         
-        joblib.dump(model_data, self.model_path)
-        print(f"Model saved to {self.model_path}")
+        self.registry.put(symbol, model_data)
+        print(f"Model saved to {self.registry.path(symbol)}")
+        
+        return True
+    
+    def train_multi_horizon(self, symbol, period="2y", horizons=HORIZONS, progress=None):
+        """Train one model for several horizons at once; see train_multi_from_features"""
+        print(f"Training multi-horizon model for {symbol}...")
+        frame = self.get_market_frame(symbol, period)
+        if frame is None or len(frame.bars) < 100:
+            print(f"Insufficient data for {symbol}")
+            return False
+        return self.train_multi_from_features(symbol, frame.features(), period, horizons, progress)
+    
+    def train_multi_from_features(self, symbol, df, period="2y", horizons=HORIZONS, progress=None,
+                                  n_estimators=100, step=10):
+        """
+        One multi-output forest predicting the forward return at every horizon
+        from the same feature row. Returns rather than prices keep the outputs
+        on comparable scales and let the trees generalise beyond the price range
+        seen in training. Each tree's output vector is kept, so prediction
+        intervals come from the spread across trees.
+        """
+        report = progress or (lambda fraction, stage: None)
+        horizons = sorted(set(int(h) for h in horizons))
+        if len(df) < 50 + horizons[-1]:
+            print(f"Insufficient features for {symbol}")
+            return False
         
+        close = df['Close'].values
+        n = len(df) - horizons[-1]
+        X = df[FEATURE_COLUMNS].values[:n]
+        y = np.column_stack([close[h:h + n] / close[:n] - 1 for h in horizons])
+        
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        report(0.1, 'fitting')
+        
+        model = RandomForestRegressor(n_estimators=step, max_depth=10, random_state=42, n_jobs=-1, warm_start=True)
+        self._grow_forest(model, X_train_scaled, y_train, n_estimators, step, report)
+        test_r2 = r2_score(y_test, model.predict(X_test_scaled), multioutput='raw_values')
+        print(f"Test R² by horizon: " + ", ".join(f"{h}d {r:.4f}" for h, r in zip(horizons, test_r2)))
+        report(0.95, 'publishing')
+        
+        self.registry.put(symbol + MULTI_SUFFIX, {
+            'model': model,
+            'scaler': scaler,
+            'features': list(FEATURE_COLUMNS),
+            'target': 'return',
+            'symbol': symbol.upper(),
+            'period': period,
+            'horizons': horizons,
+            'train_r2': float(model.score(X_train_scaled, y_train)),
+            'test_r2': float(np.mean(test_r2)),
+            'test_r2_by_horizon': {str(h): float(r) for h, r in zip(horizons, test_r2)},
+            'trained_at': datetime.now().isoformat()
+        })
+        print(f"Model saved to {self.registry.path(symbol + MULTI_SUFFIX)}")
         return True
     
-    def load_model(self):
-        """Load trained model"""
-        if os.path.exists(self.model_path):
-            try:
-                model_data = joblib.load(self.model_path)
-                self.model = model_data['model']
-                self.scaler = model_data['scaler']
-                return True
-            except Exception as e:
-                print(f"Error loading model: {e}")
-                return False
-        return False
+    @staticmethod
+    def _grow_forest(model, X, y, n_estimators, step, report):
+        """Add trees `step` at a time with warm_start up to `n_estimators`, reporting progress"""
+        start = len(getattr(model, 'estimators_', []))
+        model.set_params(warm_start=True)
+        for n in range(start + step, n_estimators + step, step):
+            model.set_params(n_estimators=min(n, n_estimators))
+            model.fit(X, y)
+            report(0.1 + 0.8 * (min(n, n_estimators) - start) / max(n_estimators - start, 1), 'fitting')
+        model.set_params(warm_start=False)
+    
+    def build_pooled_dataset(self, bars_by_symbol, target_days=5):
+        """
+        Stacked training rows for many symbols: scale-free features computed in
+        one vectorized pass, and the `target_days` forward return as target.
+        Returns (X, y, days, symbols) where `days` is each row's date.
+        """
+        names, close = indicators.stack_bars(bars_by_symbol, 'Close')
+        _, volume = indicators.stack_bars(bars_by_symbol, 'Volume', close.shape[1])
+        if not names or close.shape[1] <= target_days:
+            return None
+        days = np.full(close.shape, -1, dtype=np.int64)
+        for row, symbol in enumerate(names):
+            index = bars_by_symbol[symbol].index[-close.shape[1]:]
+            days[row, close.shape[1] - len(index):] = index.values.astype('datetime64[D]').astype(np.int64)
+        
+        features = relative_features(indicators.feature_arrays(close, volume), close)
+        X = np.stack([features[c] for c in POOLED_FEATURE_COLUMNS], axis=-1)
+        target = np.full(close.shape, np.nan)
+        target[:, :-target_days] = close[:, target_days:] / close[:, :-target_days] - 1
+        valid = np.isfinite(X).all(axis=-1) & np.isfinite(target)
+        return X[valid], target[valid], days[valid], names
+    
+    def pooled_model(self, symbol=None):
+        """The pooled model artifact (only if it covers `symbol`, when given)"""
+        model_data = self.registry.get(POOLED_MODEL_KEY)
+        if model_data is None or (symbol is not None and symbol.upper() not in model_data['symbols']):
+            return None
+        return model_data
+    
+    def train_pooled(self, symbols, period="2y", target_days=5, add_trees=0, progress=None):
+        """Train (or extend) the pooled model on `symbols`; see train_pooled_from_bars"""
+        bars = {}
+        for symbol in symbols:
+            data = self.get_stock_data(symbol.upper(), period)
+            if data is not None and len(data) >= 100:
+                bars[symbol.upper()] = data
+        return self.train_pooled_from_bars(bars, period, target_days, add_trees, progress)
+    
+    def train_pooled_from_bars(self, bars_by_symbol, period="2y", target_days=5, add_trees=0,
+                               progress=None, n_estimators=200, step=20):
+        """
+        One forest over the stacked rows of every symbol, predicting forward
+        returns so rows from different price levels are comparable. The last
+        20% of dates are held out for the reported scores.
+        
+        With `add_trees`, an existing pooled model for the same horizon is
+        extended with warm_start: the new trees are fitted on rows dated after
+        the data the model last saw (all rows if there are too few new ones),
+        and the test scores are those of the old forest on the new rows (None
+        when there are too few of them).
+        """
+        report = progress or (lambda fraction, stage: None)
+        report(0.0, 'features')
+        dataset = self.build_pooled_dataset(bars_by_symbol, target_days)
+        if dataset is None or len(dataset[0]) < 200:
+            print("Insufficient data for pooled training")
+            return None
+        X, y, days, names = dataset
+        
+        existing = self.registry.get(POOLED_MODEL_KEY) if add_trees else None
+        if existing is not None and existing['target_days'] != target_days:
+            print(f"[WARN] Pooled model predicts {existing['target_days']} days ahead; training a new one")
+            existing = None
+        
+        started = time.perf_counter()
+        if existing is not None:
+            # Extend a copy; the registry's instance may be serving predictions
+            model = copy.deepcopy(existing['model'])
+            new_rows = days > existing['data_end_day']
+            # Rows the old forest never saw are an honest out-of-sample check
+            test_score = direction = None
+            if new_rows.sum() >= 30:
+                test_score = float(model.score(X[new_rows], y[new_rows]))
+                direction = float(np.mean(np.sign(model.predict(X[new_rows])) == np.sign(y[new_rows])))
+            if new_rows.sum() >= 200:
+                X, y = X[new_rows], y[new_rows]
+            report(0.1, 'fitting')
+            self._grow_forest(model, X, y, len(model.estimators_) + add_trees, step, report)
+            train_score = float(model.score(X, y))
+            covered = sorted(set(existing['symbols']) | set(names))
+        else:
+            cutoff = np.quantile(days, 0.8)
+            train, test = days <= cutoff, days > cutoff
+            model = RandomForestRegressor(
+                n_estimators=step,
+                max_depth=10,
+                min_samples_leaf=5,
+                random_state=42,
+                n_jobs=-1,
+                warm_start=True
+            )
+            report(0.1, 'fitting')
+            self._grow_forest(model, X[train], y[train], n_estimators, step, report)
+            train_score = float(model.score(X[train], y[train]))
+            test_score = float(model.score(X[test], y[test]))
+            direction = float(np.mean(np.sign(model.predict(X[test])) == np.sign(y[test])))
+            covered = sorted(names)
+        fit_seconds = time.perf_counter() - started
+        
+        print(f"Pooled model: {len(names)} symbols, {len(X)} rows, {len(model.estimators_)} trees "
+              f"in {fit_seconds:.1f}s ({fit_seconds / len(names) * 1000:.0f} ms/symbol)")
+        print(f"Training R²: {train_score:.4f}")
+        if test_score is not None:
+            print(f"Test R²: {test_score:.4f}, directional accuracy {direction:.1%}")
+        report(0.95, 'publishing')
+        
+        model_data = {
+            'model': model,
+            'features': list(POOLED_FEATURE_COLUMNS),
+            'target': 'return',
+            'symbols': covered,
+            'period': period,
+            'target_days': target_days,
+            'rows': int(len(X)),
+            'trees': len(model.estimators_),
+            'data_end_day': int(days.max()),
+            'train_r2': train_score,
+            'test_r2': test_score,
+            'directional_accuracy': direction,
+            'fit_seconds': fit_seconds,
+            'seconds_per_symbol': fit_seconds / len(names),
+            'trained_at': datetime.now().isoformat()
+        }
+        self.registry.put(POOLED_MODEL_KEY, model_data)
+        return {k: v for k, v in model_data.items() if k != 'model'}
+    
+    def load_model(self, symbol):
+        """Trained model artifact for `symbol` (kept in memory after the first load)"""
+        return self.registry.get(symbol)
+    
+    def has_model(self, symbol):
+        return (self.registry.has(symbol) or self.registry.has(symbol + MULTI_SUFFIX)
+                or self.pooled_model(symbol) is not None)
     
     def predict_price(self, symbol, days_ahead=5):
         """Predict future stock price"""
-        if not self.load_model():
-            print("No trained model available")
+        # The symbol's own model first, then the pooled model if it covers the symbol
+        model_data = self.load_model(symbol) or self.pooled_model(symbol)
+        # A multi-horizon model answers horizons the single-horizon model wasn't trained for
+        if model_data is None or model_data.get('target_days') != days_ahead:
+            multi = self.registry.get(symbol + MULTI_SUFFIX)
+            if multi is not None and days_ahead in multi['horizons']:
+                result = self.predict_price_multi(symbol)
+                if result is not None:
+                    entry = next(e for e in result['horizons'] if e['days_ahead'] == days_ahead)
+                    return {'current_price': result['current_price'], **entry}
+        if model_data is None:
+            print(f"No trained model available for {symbol}")
             return None
+        days_ahead = model_data.get('target_days', days_ahead)
         
-        # Get recent data
-        data = self.get_stock_data(symbol, period="3mo")
-        if data is None:
+        # Latest feature row from the incremental engine: only bars added since the last call are processed
+        try:
+            latest = feature_engine.latest(symbol, model_data.get('period', '2y'))
+        except Exception as e:
+            print(f"Error fetching data for {symbol}: {e}")
             return None
-        
-        # Create features
-        df = self.create_features(data)
-        if len(df) == 0:
+        if latest is None:
             return None
         
-        # Get latest features
-        latest_features = df.iloc[-1][
-            ['SMA_5', 'SMA_20', 'SMA_50', 'Volatility', 'RSI', 
-             'MACD', 'MACD_Signal', 'Price_Change_1d', 'Price_Change_5d', 
-             'Price_Change_20d', 'Volume_Ratio']
-        ].values.reshape(1, -1)
-        
-        # Scale features
-        latest_features_scaled = self.scaler.transform(latest_features)
-        
-        # Predict
-        prediction = self.model.predict(latest_features_scaled)[0]
+        # Predict once per (latest bar, model); repeat requests reuse the stored value
+        key = (feature_engine.last_timestamp(symbol), latest['Close'], latest['Volume'], model_data.get('trained_at'))
+        cached = self._predictions.get(symbol.upper())
+        if cached is not None and cached[0] == key:
+            prediction = cached[1]
+        else:
+            if model_data.get('target') == 'return':
+                values = relative_features(latest, latest['Close'])
+                latest_features = np.array([[values[c] for c in POOLED_FEATURE_COLUMNS]])
+                prediction = latest['Close'] * (1 + float(model_data['model'].predict(latest_features)[0]))
+            else:
+                latest_features = np.array([[latest[c] for c in FEATURE_COLUMNS]])
+                latest_features_scaled = model_data['scaler'].transform(latest_features)
+                prediction = float(model_data['model'].predict(latest_features_scaled)[0])
+            self._predictions[symbol.upper()] = (key, prediction)
+        current = latest['Close']
         
         return {
-            'current_price': float(df.iloc[-1]['Close']),
+            'current_price': float(current),
             'predicted_price': float(prediction),
-            'price_change': float(prediction - df.iloc[-1]['Close']),
-            'price_change_pct': float((prediction - df.iloc[-1]['Close']) / df.iloc[-1]['Close'] * 100),
+            'price_change': float(prediction - current),
+            'price_change_pct': float((prediction - current) / current * 100),
             'days_ahead': days_ahead,
             'prediction_date': (datetime.now() + timedelta(days=days_ahead)).isoformat()
         }
     
+    def predict_price_multi(self, symbol, interval=0.8):
+        """
+        Every horizon of the multi-horizon model from one feature row and one
+        pass over the forest. `lower`/`upper` bound the central `interval` of
+        the individual trees' predictions: a measure of model disagreement,
+        not a calibrated confidence interval.
+        """
+        model_data = self.registry.get(symbol + MULTI_SUFFIX)
+        if model_data is None:
+            print(f"No multi-horizon model available for {symbol}")
+            return None
+        try:
+            latest = feature_engine.latest(symbol, model_data.get('period', '2y'))
+        except Exception as e:
+            print(f"Error fetching data for {symbol}: {e}")
+            return None
+        if latest is None:
+            return None
+        
+        key = (feature_engine.last_timestamp(symbol), latest['Close'], latest['Volume'],
+               model_data.get('trained_at'), interval)
+        cached = self._predictions.get(symbol.upper() + MULTI_SUFFIX)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        x = model_data['scaler'].transform(np.array([[latest[c] for c in FEATURE_COLUMNS]]))
+        # (trees, horizons): the forest's prediction is the mean over trees
+        per_tree = np.stack([tree.predict(x)[0] for tree in model_data['model'].estimators_])
+        tail = (1 - interval) / 2 * 100
+        mean = per_tree.mean(axis=0)
+        lower, upper = np.percentile(per_tree, [tail, 100 - tail], axis=0)
+        
+        current = float(latest['Close'])
+        now = datetime.now()
+        result = {
+            'current_price': current,
+            'as_of': str(pd.Timestamp(feature_engine.last_timestamp(symbol)).date()),
+            'interval': interval,
+            'trained_at': model_data.get('trained_at'),
+            'horizons': [
+                {
+                    'days_ahead': h,
+                    'predicted_price': current * (1 + float(mean[i])),
+                    'price_change': current * float(mean[i]),
+                    'price_change_pct': float(mean[i] * 100),
+                    'lower': current * (1 + float(lower[i])),
+                    'upper': current * (1 + float(upper[i])),
+                    'prediction_date': (now + timedelta(days=h)).isoformat()
+                }
+                for i, h in enumerate(model_data['horizons'])
+            ],
+        }
+        self._predictions[symbol.upper() + MULTI_SUFFIX] = (key, result)
+        return result
+    
     def get_stock_analysis(self, symbol):
         """Get comprehensive stock analysis"""
-        data = self.get_stock_data(symbol, period="1y")
-        if data is None:
+        frame = self.get_market_frame(symbol, period="1y")
+        if frame is None:
             return None
-        
-        df = self.create_features(data)
+        # Built once per bar set; repeat requests get the memoized result
+        return frame.memoize(('analysis',), lambda: self._build_analysis(symbol, frame))
+    
+    def _build_analysis(self, symbol, frame):
+        df = frame.features()
         if len(df) == 0:
             return None
         
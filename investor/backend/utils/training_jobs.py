@@ -0,0 +1,254 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from utils.enhanced_ml_advisor import enhanced_ml_advisor
+from utils.process_pool import SharedProcessPool
+from utils.stock_predictor import stock_predictor
+from utils.training_worker import JobCancelled, train_enhanced, train_pooled, train_stock
+
+JOB_KINDS = ('stock', 'pooled', 'enhanced_allocation')
+ACTIVE_STATES = ('queued', 'preparing', 'running')
+TRAIN_PERIODS = ('6mo', '1y', '2y', '5y')
+
+
+class TrainingJobManager:
+    """
+    Background model training.
+
+    `submit` returns a job id straight away. A dispatcher thread prepares
+    the inputs (market data is fetched in this process, where the history
+    store and rate limiter live) and hands the CPU-heavy fit to a process
+    pool capped at `max_workers`. Workers report progress and check for
+    cancellation through a manager dict; a queued job is cancelled outright
+    and a running one stops at its next progress report. Training code
+    publishes artifacts by atomic rename, and the serving side reloads a
+    model when its file changes, so finished jobs go live without a restart.
+    A second submission for a model that is already queued or training
+    returns the existing job.
+    """
+
+    def __init__(self, max_workers: int = 2, keep: int = 200):
+        self.max_workers = max_workers
+        self.keep = keep
+        self._dispatcher = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="training-dispatch")
+        self._pool = SharedProcessPool(max_workers, name="Training")
+        self._manager = None
+        self._shared = None
+        self._jobs: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._futures: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    # ---- Infrastructure ----
+    def _ensure_started(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = self._pool.context.Manager()
+                self._shared = self._manager.dict()
+
+    @staticmethod
+    def _dedupe_key(kind: str, params: Dict) -> str:
+        return f"{kind}:{params.get('symbol', '')}:{params.get('horizons') or ''}"
+
+    @staticmethod
+    def validate(kind: str, params: Dict) -> Dict:
+        """Normalised job parameters; raises ValueError on bad input"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of {list(JOB_KINDS)}")
+        if kind == 'stock':
+            symbol = str(params.get('symbol', '')).strip().upper()
+            if not symbol:
+                raise ValueError("symbol is required for stock training")
+            period = params.get('period', '2y')
+            if period not in TRAIN_PERIODS:
+                raise ValueError(f"period must be one of {list(TRAIN_PERIODS)}")
+            target_days = int(params.get('target_days', 5))
+            if not 1 <= target_days <= 60:
+                raise ValueError("target_days must be between 1 and 60")
+            horizons = params.get('horizons')
+            if horizons is not None:
+                if not isinstance(horizons, list) or not 1 <= len(horizons) <= 8:
+                    raise ValueError("horizons must be a list of 1 to 8 day counts")
+                horizons = sorted(set(int(h) for h in horizons))
+                if not all(1 <= h <= 60 for h in horizons):
+                    raise ValueError("horizons must be between 1 and 60 days")
+            return {'symbol': symbol, 'period': period, 'target_days': target_days, 'horizons': horizons}
+        if kind == 'pooled':
+            symbols = params.get('symbols') or []
+            if not isinstance(symbols, list) or not symbols:
+                raise ValueError("symbols must be a non-empty list for pooled training")
+            symbols = list(dict.fromkeys(str(s).strip().upper() for s in symbols if str(s).strip()))
+            if len(symbols) > 1000:
+                raise ValueError("At most 1000 symbols per pooled model")
+            period = params.get('period', '2y')
+            if period not in TRAIN_PERIODS:
+                raise ValueError(f"period must be one of {list(TRAIN_PERIODS)}")
+            target_days = int(params.get('target_days', 5))
+            if not 1 <= target_days <= 60:
+                raise ValueError("target_days must be between 1 and 60")
+            add_trees = int(params.get('add_trees', 0))
+            if not 0 <= add_trees <= 1000:
+                raise ValueError("add_trees must be between 0 and 1000")
+            return {'symbols': symbols, 'period': period, 'target_days': target_days, 'add_trees': add_trees}
+        n_samples = int(params.get('n_samples', 100000))
+        if not 1000 <= n_samples <= 500000:
+            raise ValueError("n_samples must be between 1000 and 500000")
+        return {'n_samples': n_samples}
+
+    # ---- Public API ----
+    def submit(self, kind: str, params: Dict) -> Dict:
+        params = self.validate(kind, params)
+        key = self._dedupe_key(kind, params)
+        self._ensure_started()
+        with self._lock:
+            for job in self._jobs.values():
+                if job['key'] == key and job['status'] in ACTIVE_STATES:
+                    return self._view(job)
+            job = {
+                'id': uuid.uuid4().hex[:12],
+                'kind': kind,
+                'key': key,
+                'params': params,
+                'status': 'queued',
+                'progress': 0.0,
+                'stage': 'queued',
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+                'result': None,
+            }
+            self._jobs[job['id']] = job
+            self._trim()
+            # Registered under the lock `_finish` takes, so a job that ends
+            # straight away can't leave a stale future behind
+            future = self._dispatcher.submit(self._execute, job['id'])
+            if job['status'] in ACTIVE_STATES:
+                self._futures[job['id']] = future
+            return self._view(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._view(job) if job else None
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())[-limit:]
+            return [self._view(job) for job in reversed(jobs)]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] not in ACTIVE_STATES:
+                return self._view(job)
+            job['cancel_requested'] = True
+            future = self._futures.get(job_id)
+        if self._shared is not None:
+            self._shared[f"{job_id}:cancel"] = True
+        if future is not None and future.cancel():
+            self._finish(job_id, 'cancelled')
+        return self.get(job_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {'max_workers': self.max_workers, 'start_method': self._pool.start_method, **counts}
+
+    # ---- Internals ----
+    def _view(self, job: Dict) -> Dict:
+        view = {k: v for k, v in job.items() if k != 'key'}
+        if job['status'] == 'running' and self._shared is not None:
+            progress = self._shared.get(f"{job['id']}:progress")
+            if progress:
+                view['progress'], view['stage'] = progress
+        return view
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None, result: Optional[Dict] = None):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status=status, stage=status, error=error, result=result, finished_at=time.time())
+            if status == 'succeeded':
+                job['progress'] = 1.0
+            elif self._shared is not None:
+                job['progress'], _ = self._shared.get(f"{job_id}:progress", (job['progress'], None))
+            self._futures.pop(job_id, None)
+        if self._shared is not None:
+            for suffix in ('progress', 'cancel'):
+                self._shared.pop(f"{job_id}:{suffix}", None)
+
+    def _cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            return bool(self._jobs[job_id].get('cancel_requested'))
+
+    def _execute(self, job_id: str):
+        with self._lock:
+            job = self._jobs[job_id]
+            kind, params = job['kind'], dict(job['params'])
+        if self._cancelled(job_id):
+            return self._finish(job_id, 'cancelled')
+
+        pool = None
+        try:
+            self._update(job_id, status='preparing', stage='loading data', started_at=time.time())
+            if kind == 'stock':
+                frame = stock_predictor.get_market_frame(params['symbol'], params['period'])
+                if frame is None or len(frame.bars) < 100:
+                    return self._finish(job_id, 'failed', f"Insufficient data for {params['symbol']}")
+                args = (train_stock, job_id, self._shared, params['symbol'], frame.features(),
+                        params['period'], params['target_days'], str(stock_predictor.registry.root),
+                        params['horizons'])
+            elif kind == 'pooled':
+                bars = {}
+                for symbol in params['symbols']:
+                    data = stock_predictor.get_stock_data(symbol, params['period'])
+                    if data is not None and len(data) >= 100:
+                        bars[symbol] = data
+                if not bars:
+                    return self._finish(job_id, 'failed', "No market data for any of the symbols")
+                args = (train_pooled, job_id, self._shared, bars, params['period'], params['target_days'],
+                        params['add_trees'], str(stock_predictor.registry.root))
+            else:
+                args = (train_enhanced, job_id, self._shared, params['n_samples'],
+                        enhanced_ml_advisor.model_path)
+
+            if self._cancelled(job_id):
+                return self._finish(job_id, 'cancelled')
+            self._update(job_id, status='running', stage='starting')
+            pool = self._pool.get()
+            result = pool.submit(*args).result()
+            self._finish(job_id, 'succeeded', result=result)
+        except JobCancelled:
+            self._finish(job_id, 'cancelled')
+        except CancelledError:
+            self._finish(job_id, 'cancelled')
+        except BrokenProcessPool as e:
+            print(f"[ERROR] Training worker crashed for job {job_id}: {e}")
+            self._pool.reset(pool)
+            self._finish(job_id, 'failed', "Training worker crashed")
+        except Exception as e:
+            print(f"[ERROR] Training job {job_id} failed: {e}")
+            self._finish(job_id, 'failed', str(e))
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond `keep` (called with the lock held)"""
+        finished = [jid for jid, job in self._jobs.items() if job['status'] not in ACTIVE_STATES]
+        for jid in finished[:max(0, len(self._jobs) - self.keep)]:
+            self._jobs.pop(jid, None)
+
+
+# Global instance
+training_jobs = TrainingJobManager(max_workers=int(os.environ.get('TRAINING_WORKERS', 2)))
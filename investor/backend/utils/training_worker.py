@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional
+
+from utils.enhanced_ml_advisor import EnhancedMLAdvisor
+from utils.model_registry import ModelRegistry
+from utils.stock_predictor import MULTI_SUFFIX, StockPredictor
+
+# Entry points for the training process pool (see utils/training_jobs.py).
+# Pool workers are spawned: each is a fresh interpreter that re-imports the
+# server's main module as __mp_main__ (app.py keeps its startup work in
+# start_services(), behind `if __name__ == "__main__"`) and then imports this
+# module to unpickle the job function. Keep this module free of import-time
+# side effects as well.
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job was cancelled"""
+
+
+class _Reporter:
+    """Progress callback handed to the training code inside the worker process"""
+
+    def __init__(self, job_id: str, shared):
+        self.job_id = job_id
+        self.shared = shared
+
+    def __call__(self, fraction: float, stage: str):
+        if self.shared.get(f"{self.job_id}:cancel"):
+            raise JobCancelled(self.job_id)
+        self.shared[f"{self.job_id}:progress"] = (round(float(fraction), 3), stage)
+
+
+def train_stock(job_id: str, shared, symbol: str, features, period: str, target_days: int,
+                models_dir: str, horizons: Optional[List[int]] = None) -> Dict:
+    report = _Reporter(job_id, shared)
+    report(0.05, 'starting')
+    predictor = StockPredictor(registry=ModelRegistry(root=models_dir))
+    if horizons:
+        trained = predictor.train_multi_from_features(symbol, features, period, horizons, progress=report)
+        key = symbol + MULTI_SUFFIX
+    else:
+        trained = predictor.train_from_features(symbol, features, period, target_days, progress=report)
+        key = symbol
+    if not trained:
+        raise ValueError(f"Insufficient data to train a model for {symbol}")
+    model_data = predictor.registry.get(key)
+    return {
+        'artifact': str(predictor.registry.path(key)),
+        'train_r2': model_data['train_r2'],
+        'test_r2': model_data['test_r2'],
+        'trained_at': model_data['trained_at'],
+    }
+
+
+def train_pooled(job_id: str, shared, bars: Dict, period: str, target_days: int, add_trees: int,
+                 models_dir: str) -> Dict:
+    report = _Reporter(job_id, shared)
+    predictor = StockPredictor(registry=ModelRegistry(root=models_dir))
+    summary = predictor.train_pooled_from_bars(bars, period, target_days, add_trees, progress=report)
+    if summary is None:
+        raise ValueError("Insufficient data for pooled training")
+    return summary
+
+
+def train_enhanced(job_id: str, shared, n_samples: int, model_path: str) -> Dict:
+    report = _Reporter(job_id, shared)
+    advisor = EnhancedMLAdvisor()
+    advisor.model_path = model_path
+    advisor.train_enhanced_model(n_samples, progress=report)
+    return {'artifact': model_path}
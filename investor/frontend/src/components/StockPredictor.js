@@ -34,9 +34,16 @@ const StockPredictor = () => {
     setLoading(true);
     try {
       const res = await axios.post(`http://127.0.0.1:5500/stock/train/${selected}`, { period: '2y' });
-      if (res.data.success) {
+      if (!res.data.success) { setError(res.data.message); setLoading(false); return; }
+      // Training runs in the background; poll the job until it finishes
+      let job = res.data.job;
+      while (['queued', 'preparing', 'running'].includes(job.status)) {
+        await new Promise(r => setTimeout(r, 2000));
+        job = (await axios.get(`http://127.0.0.1:5500/jobs/${job.id}`)).data;
+      }
+      if (job.status === 'succeeded') {
         alert('Model trained!'); fetchStock(selected);
-      } else setError(res.data.message);
+      } else setError(job.error || `Training ${job.status}`);
     } catch {
       setError('Failed to train model');
     }